@@ -1,5 +1,4 @@
 from django.contrib import admin
-from django.db.models import Count
 
 from .models import (Recipe,
                      Tag,
@@ -11,19 +10,9 @@ from .models import (Recipe,
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('name', 'author', 'total_favorites')
+    list_display = ('name', 'author', 'favorites_count')
     list_filter = ('name', 'author', 'tags')
 
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        queryset = queryset.annotate(total_favorites=Count('favorite_recipe'))
-        return queryset
-
-    def total_favorites(self, obj):
-        return obj.total_favorites
-
-    total_favorites.short_description = 'Добавлений в избранное'
-
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
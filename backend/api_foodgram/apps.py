@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ApiFoodgramConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api_foodgram'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .pdf import register_fonts
+        register_fonts()
@@ -0,0 +1,64 @@
+"""Кэш общей для всех пользователей части карточек рецептов.
+
+Версией карточки служит Recipe.updated_at: любое изменение рецепта,
+его ингредиентов, тэгов или автора сдвигает эту дату (см. signals.py),
+поэтому устаревшие записи просто перестают запрашиваться.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+USER_FIELDS = ('is_favorited', 'is_in_shopping_cart')
+
+
+def _get(recipe, field):
+    """Рецепт приходит либо экземпляром модели, либо строкой values()."""
+    if isinstance(recipe, dict):
+        return recipe[field]
+    return getattr(recipe, field)
+
+
+def recipe_id(recipe):
+    return _get(recipe, 'id')
+
+
+def _card_key(request, recipe):
+    return 'recipe_card:{}:{}:{}'.format(
+        request.build_absolute_uri('/'),
+        recipe_id(recipe),
+        _get(recipe, 'updated_at').timestamp())
+
+
+def get_cards(request, recipes):
+    """Возвращает закэшированные карточки в виде {id рецепта: карточка}."""
+    keys = {_card_key(request, recipe): recipe_id(recipe)
+            for recipe in recipes}
+    found = cache.get_many(keys)
+    return {keys[key]: card for key, card in found.items()}
+
+
+def set_cards(request, recipes, representations):
+    """Сохраняет карточки без персональных полей и возвращает их."""
+    cards = {}
+    for recipe, representation in zip(recipes, representations):
+        card = {key: value for key, value in representation.items()
+                if key not in USER_FIELDS}
+        card['author'] = {key: value
+                          for key, value in representation['author'].items()
+                          if key != 'is_subscribed'}
+        cards[recipe_id(recipe)] = card
+    cache.set_many(
+        {_card_key(request, recipe): cards[recipe_id(recipe)]
+         for recipe in recipes},
+        settings.RECIPE_CARD_CACHE_TIMEOUT)
+    return cards
+
+
+def personalize(card, recipe, subscribed_authors):
+    """Дополняет карточку флагами текущего пользователя."""
+    data = dict(card)
+    data['author'] = dict(
+        card['author'],
+        is_subscribed=_get(recipe, 'author_id') in subscribed_authors)
+    for field in USER_FIELDS:
+        data[field] = _get(recipe, field)
+    return data
@@ -0,0 +1,88 @@
+"""Хранимые счётчики рецептов, избранного, списков покупок и подписок.
+
+Счётчик меняется запросом UPDATE ... SET field = field + n в той же
+транзакции, что и запись, от которой он зависит, поэтому параллельные
+запросы не теряют изменений. Правки в обход API (админка, удаление
+пользователя) счётчики не обновляют - расхождения исправляет команда
+reconcile_counters.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from users.models import Subscription
+
+from .models import Recipe, ShoppingCart, UserFavorite
+
+User = get_user_model()
+
+# Модель со счётчиками: {поле счётчика: (модель связи, поле связи)}.
+COUNTERS = {
+    Recipe: {
+        'favorites_count': (UserFavorite, 'recipe'),
+        'carts_count': (ShoppingCart, 'recipe'),
+    },
+    User: {
+        'recipes_count': (Recipe, 'author'),
+        'followers_count': (Subscription, 'author'),
+        'following_count': (Subscription, 'user'),
+    },
+}
+# Счётчик рецепта для каждой модели связи пользователя с рецептом.
+RECIPE_COUNTERS = {
+    related_model: field
+    for field, (related_model, _) in COUNTERS[Recipe].items()}
+
+
+def change(model, pks, field, delta):
+    """Прибавляет delta к счётчику field у объектов model с id из pks."""
+    if not pks or not delta:
+        return
+    value = F(field) + delta
+    if delta < 0:
+        value = Greatest(value, 0)
+    model.objects.filter(pk__in=pks).update(**{field: value})
+
+
+def change_recipes(model, recipe_ids, delta):
+    """Счётчик рецептов после добавления в избранное или список покупок
+    (model) или удаления из них."""
+    change(Recipe, recipe_ids, RECIPE_COUNTERS[model], delta)
+
+
+def change_subscription(user_id, author_id, delta):
+    change(User, [author_id], 'followers_count', delta)
+    change(User, [user_id], 'following_count', delta)
+
+
+def count_subquery(related_model, field):
+    return Coalesce(Subquery(
+        related_model.objects
+        .filter(**{field: OuterRef('pk')})
+        .order_by().values(field)
+        .annotate(count=Count('pk')).values('count')), 0)
+
+
+def reconcile(model, pks, dry_run=False):
+    """Пересчитывает счётчики объектов model с id из pks и возвращает
+    число исправленных объектов."""
+    counters = COUNTERS[model]
+    objects = (model.objects
+               .select_for_update()
+               .filter(pk__in=pks)
+               .only('pk', *counters)
+               .annotate(**{
+                   f'actual_{field}': count_subquery(*source)
+                   for field, source in counters.items()}))
+    changed = []
+    for obj in objects:
+        actual = {field: getattr(obj, f'actual_{field}')
+                  for field in counters}
+        if any(getattr(obj, field) != value
+               for field, value in actual.items()):
+            for field, value in actual.items():
+                setattr(obj, field, value)
+            changed.append(obj)
+    if changed and not dry_run:
+        model.objects.bulk_update(changed, list(counters))
+    return len(changed)
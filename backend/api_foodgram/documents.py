@@ -0,0 +1,74 @@
+"""Кэш и фоновая отрисовка документов со списком покупок.
+
+Ключом документа служит хэш пользователя, формата и строк списка
+покупок: любое изменение списка или рецептов в нём меняет строки, а
+значит и ключ, поэтому устаревшие документы просто перестают
+запрашиваться. Этот же хэш служит идентификатором фоновой задачи.
+
+Задачи выполняются в пуле потоков текущего процесса (workers.py), а
+готовые документы складываются в кэш, поэтому при нескольких процессах
+gunicorn кэш должен быть общим (CACHE_BACKEND), иначе опрос может
+попасть в процесс, который о задаче не знает.
+"""
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import workers
+
+logger = logging.getLogger('foodgram.documents')
+
+
+def get_job_id(user_id, renderer, rows):
+    payload = json.dumps([user_id, renderer.format, rows],
+                         ensure_ascii=False, default=str)
+    return hashlib.md5(payload.encode()).hexdigest()
+
+
+def _document_key(job_id):
+    return f'shopping_list_document:{job_id}'
+
+
+def _pending_key(job_id):
+    return f'shopping_list_pending:{job_id}'
+
+
+def get_document(job_id, user_id):
+    """Готовый документ {'format', 'content'} пользователя или None."""
+    document = cache.get(_document_key(job_id))
+    if document is None or document['user_id'] != user_id:
+        return None
+    return document
+
+
+def is_pending(job_id, user_id):
+    return cache.get(_pending_key(job_id)) == user_id
+
+
+def render_document(job_id, user_id, renderer, rows):
+    content = renderer.render(rows)
+    cache.set(_document_key(job_id),
+              {'user_id': user_id, 'format': renderer.format,
+               'content': content},
+              settings.SHOPPING_LIST_CACHE_TIMEOUT)
+    return content
+
+
+def _render_in_background(job_id, user_id, renderer, rows):
+    try:
+        render_document(job_id, user_id, renderer, rows)
+    except Exception:
+        logger.exception('Не удалось построить список покупок %s', job_id)
+    finally:
+        cache.delete(_pending_key(job_id))
+
+
+def submit(job_id, user_id, renderer, rows):
+    """Ставит отрисовку в очередь, если она ещё не запущена."""
+    if cache.add(_pending_key(job_id), user_id,
+                 settings.SHOPPING_LIST_RENDER_TIMEOUT):
+        workers.submit(
+            _render_in_background, job_id, user_id, renderer, rows)
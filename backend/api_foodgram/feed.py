@@ -0,0 +1,102 @@
+"""Лента рецептов авторов, на которых подписан пользователь.
+
+Новый рецепт раскладывается в FeedEntry каждого подписчика автора
+(fan-out при записи) в фоновом пуле после фиксации транзакции, а
+подписка и отписка добавляют и удаляют записи её автора. FeedEntry
+хранит дату публикации рецепта, поэтому страница ленты читается по
+индексу (user, -created_at, -recipe) без обращения к таблице рецептов.
+
+Для авторов, у которых подписчиков больше FEED_FANOUT_MAX_FOLLOWERS,
+раскладка слишком дорога: их рецепты не раскладываются, а подмешиваются
+в ленту при чтении, и лента подписчика такого автора собирается
+запросом к рецептам. Если автор пересёк порог в обратную сторону, ленту
+восстанавливает команда rebuild_feed.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Q
+
+from users.models import Subscription
+
+from . import workers
+from .models import FeedEntry, Recipe
+
+User = get_user_model()
+BATCH_SIZE = 1000
+
+
+def is_fanned_out(author):
+    return author.followers_count <= settings.FEED_FANOUT_MAX_FOLLOWERS
+
+
+def fan_out(recipe_id):
+    recipe = (Recipe.objects.select_related('author')
+              .filter(pk=recipe_id).first())
+    if recipe is None or not is_fanned_out(recipe.author):
+        return
+    follower_ids = (Subscription.objects.filter(author_id=recipe.author_id)
+                    .values_list('user_id', flat=True))
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, recipe_id=recipe.pk,
+                   author_id=recipe.author_id, created_at=recipe.created_at)
+         for user_id in follower_ids.iterator()),
+        batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+def schedule_fan_out(recipe):
+    transaction.on_commit(lambda: workers.submit(fan_out, recipe.pk))
+
+
+def follow(user_id, author):
+    """Добавляет в ленту подписчика рецепты автора."""
+    if not is_fanned_out(author):
+        return
+    recipes = (Recipe.objects.filter(author=author)
+               .values_list('pk', 'created_at'))
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                   author_id=author.pk, created_at=created_at)
+         for recipe_id, created_at in recipes.iterator()),
+        batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+def unfollow(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def large_author_ids(user):
+    """id авторов пользователя, чьи рецепты не раскладываются в ленту."""
+    return list(
+        User.objects
+        .filter(subscribing__user=user,
+                followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS)
+        .values_list('pk', flat=True))
+
+
+def entries(user):
+    """Записи ленты пользователя, у которого нет авторов из
+    large_author_ids."""
+    return FeedEntry.objects.filter(user=user).only('recipe', 'created_at')
+
+
+def recipes_filter(user, author_ids):
+    """Условие на Recipe: рецепт из ленты пользователя или автора из
+    author_ids."""
+    return (Q(pk__in=FeedEntry.objects.filter(user=user).values('recipe_id'))
+            | Q(author_id__in=author_ids))
+
+
+def rebuild(user_ids):
+    """Собирает ленты пользователей user_ids заново по подпискам."""
+    FeedEntry.objects.filter(user_id__in=user_ids).delete()
+    rows = (Recipe.objects
+            .filter(author__subscribing__user__in=user_ids,
+                    author__followers_count__lte=(
+                        settings.FEED_FANOUT_MAX_FOLLOWERS))
+            .values('author_id', 'created_at', recipe_id=F('pk'),
+                    user_id=F('author__subscribing__user'))
+            .order_by())
+    return len(FeedEntry.objects.bulk_create(
+        (FeedEntry(**row) for row in rows.iterator()),
+        batch_size=BATCH_SIZE))
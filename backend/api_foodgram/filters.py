@@ -1,6 +1,6 @@
 from django_filters import rest_framework as filters
 
-from .models import Recipe
+from .models import Recipe, Tag
 
 CHOICES = (
     (0, 'False'),
@@ -9,7 +9,10 @@ CHOICES = (
 
 
 class RecipeFilter(filters.FilterSet):
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = filters.ModelMultipleChoiceFilter(
+        field_name='tags__slug',
+        to_field_name='slug',
+        queryset=Tag.objects.all())
     author = filters.NumberFilter(field_name='author__id')
     is_favorited = filters.ChoiceFilter(
         choices=CHOICES, method='get_favorited')
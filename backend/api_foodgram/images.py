@@ -0,0 +1,65 @@
+"""Уменьшенные WebP-копии изображений рецептов.
+
+Оригинал сохраняется как есть, а копии для ленты и страницы рецепта
+строятся в фоновом пуле (workers.py) после фиксации транзакции. Пока
+копий нет, API отдаёт вместо них оригинал.
+"""
+from io import BytesIO
+from pathlib import Path
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from . import workers
+from .models import Recipe
+
+# Ключ в ответе API: (поле модели, наибольшие ширина и высота).
+VARIANTS = {
+    'card': ('image_card', (480, 480)),
+    'detail': ('image_detail', (1200, 1200)),
+}
+WEBP_QUALITY = 80
+
+
+def _render(original, size):
+    image = original.copy()
+    image.thumbnail(size, Image.LANCZOS)
+    buffer = BytesIO()
+    image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    return ContentFile(buffer.getvalue())
+
+
+def make_variants(recipe_id, stale_names=()):
+    """Строит копии для текущего изображения рецепта и удаляет
+    stale_names - копии предыдущего изображения."""
+    recipe = Recipe.objects.filter(pk=recipe_id).only('image').first()
+    storage = Recipe._meta.get_field('image').storage
+    for name in stale_names:
+        if name:
+            storage.delete(name)
+    if recipe is None or not recipe.image:
+        return
+    with recipe.image.open('rb') as file, Image.open(file) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ('RGB', 'RGBA'):
+            original = original.convert('RGBA')
+        stem = Path(recipe.image.name).stem
+        names = {}
+        for field, size in VARIANTS.values():
+            name = Recipe._meta.get_field(field).generate_filename(
+                recipe, f'{stem}.webp')
+            names[field] = storage.save(name, _render(original, size))
+    # Если изображение успели заменить, копии уже не нужны.
+    updated = Recipe.objects.filter(
+        pk=recipe_id, image=recipe.image.name
+    ).update(updated_at=timezone.now(), **names)
+    if not updated:
+        for name in names.values():
+            storage.delete(name)
+
+
+def schedule_variants(recipe, stale_names=()):
+    transaction.on_commit(
+        lambda: workers.submit(make_variants, recipe.pk, stale_names))
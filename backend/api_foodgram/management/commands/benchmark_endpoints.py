@@ -0,0 +1,115 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api_foodgram.models import Recipe, Tag
+
+from .generate_fake_data import FAKE_PREFIX
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Замер задержки (p50/p95) и числа SQL-запросов основных '
+            'эндпоинтов на синтетических данных разного объёма')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='',
+            help='Через запятую: число пользователей для каждого прогона. '
+                 'Рецептов генерируется в --recipes-per-user раз больше. '
+                 'Без параметра замеряются уже загруженные данные.')
+        parser.add_argument('--recipes-per-user', type=int, default=5)
+        parser.add_argument('--cart', type=int, default=5,
+                            help='Рецептов в списке покупок на пользователя')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--cold', action='store_true',
+                            help='Очищать кэш перед каждым запросом')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size]
+        if not sizes:
+            self.run(options)
+            return
+        for size in sizes:
+            call_command(
+                'generate_fake_data', clear=True, users=size,
+                recipes=size * options['recipes_per_user'],
+                cart=options['cart'], seed=options['seed'],
+                stdout=self.stdout)
+            self.run(options)
+
+    def get_endpoints(self, user):
+        recipe = Recipe.objects.filter(author__subscribing__user=user).first()
+        recipe = recipe or Recipe.objects.first()
+        tag = Tag.objects.first()
+        return [
+            ('recipes', '/api/recipes/'),
+            ('recipes limit=50', '/api/recipes/?limit=50'),
+            ('recipes page=20', '/api/recipes/?page=20'),
+            ('recipes cursor', '/api/recipes/?pagination=cursor'),
+            ('feed', '/api/recipes/feed/'),
+            ('recipes tags', f'/api/recipes/?tags={tag.slug}'),
+            ('recipes author', f'/api/recipes/?author={recipe.author_id}'),
+            ('recipes favorited', '/api/recipes/?is_favorited=1'),
+            ('recipes in cart', '/api/recipes/?is_in_shopping_cart=1'),
+            ('recipe detail', f'/api/recipes/{recipe.pk}/'),
+            ('subscriptions', '/api/users/subscriptions/?recipes_limit=3'),
+            ('users', '/api/users/'),
+            ('ingredients search', '/api/ingredients/?name=са'),
+            *((f'shopping cart {file_format}',
+               f'/api/recipes/download_shopping_cart/?format={file_format}')
+              for file_format in ('pdf', 'json', 'csv', 'txt')),
+        ]
+
+    def get_user(self):
+        return (User.objects
+                .filter(username__startswith=FAKE_PREFIX)
+                .annotate(cart=Count('user_shopping_cart'))
+                .order_by('-cart').first()
+                or User.objects.first())
+
+    def measure(self, client, url, repeat, cold):
+        timings, queries, status = [], 0, None
+        for _ in range(repeat):
+            if cold:
+                cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = client.get(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries, status = len(context), response.status_code
+        if len(timings) > 1:
+            percentiles = statistics.quantiles(timings, n=20)
+            p50, p95 = statistics.median(timings), percentiles[-1]
+        else:
+            p50 = p95 = timings[0]
+        return status, p50, p95, queries
+
+    def run(self, options):
+        user = self.get_user()
+        client = APIClient(HTTP_HOST='localhost')
+        client.force_authenticate(user)
+        self.stdout.write(
+            f'\nРецептов: {Recipe.objects.count()}, '
+            f'пользователей: {User.objects.count()}, '
+            f'замер от имени {user.username}')
+        self.stdout.write(
+            f'{"endpoint":<22}{"status":>7}{"p50, мс":>10}'
+            f'{"p95, мс":>10}{"SQL":>6}')
+        for name, url in self.get_endpoints(user):
+            status, p50, p95, queries = self.measure(
+                client, url, options['repeat'], options['cold'])
+            self.stdout.write(
+                f'{name:<22}{status:>7}{p50:>10.1f}{p95:>10.1f}{queries:>6}')
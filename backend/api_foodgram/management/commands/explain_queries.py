@@ -0,0 +1,150 @@
+import json
+import re
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .benchmark_endpoints import Command as BenchmarkCommand
+
+SORT_NODES = ('Sort', 'Incremental Sort')
+MAX_SQL_WIDTH = 120
+BASELINE_PATH = Path(__file__).resolve().parents[2] / 'explain_baseline.json'
+# Запросы через .iterator() идут серверным курсором: DECLARE ... FOR SELECT.
+CURSOR_PREFIX = re.compile(
+    r'^\s*DECLARE\s+\S+\s+.*?\bCURSOR\b.*?\bFOR\s+',
+    re.IGNORECASE | re.DOTALL)
+# Значения параметров заменяются на ?, списки IN (?, ?, ...) - на (?).
+SQL_LITERALS = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\(\?(?:, \?)*\)'), '(?)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+def explainable_sql(sql):
+    """SELECT-часть запроса или None, если объяснять нечего."""
+    sql = CURSOR_PREFIX.sub('', sql, count=1)
+    if sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return sql
+    return None
+
+
+def normalize_sql(sql):
+    """Текст запроса без значений параметров - ключ запроса в эталоне."""
+    for pattern, replacement in SQL_LITERALS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def new_nodes(plans, baseline):
+    """(эндпоинт, запрос, узел) для узлов, которых нет в эталоне этого
+    запроса."""
+    for name, queries in plans.items():
+        for sql, nodes in queries.items():
+            expected = baseline.get(name, {}).get(sql, ())
+            for node in nodes:
+                if node not in expected:
+                    yield name, sql, node
+
+
+def flagged_nodes(plan):
+    """Узлы плана, которые обычно означают отсутствие подходящего
+    индекса: последовательное чтение таблицы и сортировка."""
+    node_type = plan['Node Type']
+    if node_type == 'Seq Scan':
+        yield f'Seq Scan on {plan["Relation Name"]}'
+    elif node_type in SORT_NODES:
+        yield f'{node_type} by {", ".join(plan["Sort Key"])}'
+    for child in plan.get('Plans', ()):
+        yield from flagged_nodes(child)
+
+
+class Command(BenchmarkCommand):
+    help = ('Планы EXPLAIN для SQL-запросов основных эндпоинтов и сверка '
+            'с эталоном: новые Seq Scan и Sort считаются регрессией. '
+            'Запускать на PostgreSQL с данными из generate_fake_data.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--baseline', default=str(BASELINE_PATH),
+                            help='JSON-файл с эталонными планами')
+        parser.add_argument('--update', action='store_true',
+                            help='Записать текущие планы в --baseline')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Планы сверяются только на PostgreSQL')
+        plans = self.get_plans(options['verbosity'])
+        if options['update']:
+            with open(options['baseline'], 'w', encoding='utf-8') as file:
+                json.dump(plans, file, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f'Эталон записан в {options["baseline"]}'))
+            return
+        # Без эталона регрессий нет: печатаются только текущие планы.
+        baseline = plans
+        if Path(options['baseline']).exists():
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+        regressions = self.report(plans, baseline)
+        if regressions:
+            raise CommandError(
+                f'Новые Seq Scan/Sort в планах: {regressions}')
+
+    def get_plans(self, verbosity=1):
+        """{эндпоинт: {запрос без параметров: отсортированные Seq Scan и
+        Sort из его плана}}; запросы без таких узлов не попадают."""
+        user = self.get_user()
+        client = APIClient(HTTP_HOST='localhost')
+        client.force_authenticate(user)
+        return {
+            name: {sql: sorted(nodes) for sql, nodes in sorted(
+                self.explain(client, url, verbosity).items())}
+            for name, url in self.get_endpoints(user)}
+
+    def explain(self, client, url, verbosity):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        queries = {}
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                sql = explainable_sql(query['sql'])
+                if sql is None:
+                    continue
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                if verbosity > 1:
+                    self.stdout.write(f'{sql}\n{json.dumps(plan, indent=2)}')
+                nodes = set(flagged_nodes(plan[0]['Plan']))
+                if nodes:
+                    queries.setdefault(normalize_sql(sql), set()).update(
+                        nodes)
+        return queries
+
+    def report(self, plans, baseline):
+        """Печатает отмеченные узлы по эндпоинтам и запросам (+ новые,
+        - исчезнувшие) и возвращает число новых."""
+        regressions = set(new_nodes(plans, baseline))
+        for name, queries in plans.items():
+            self.stdout.write(name)
+            expected = baseline.get(name, {})
+            for sql in sorted(queries.keys() | expected.keys()):
+                self.stdout.write(f'  {sql[:MAX_SQL_WIDTH]}')
+                nodes = queries.get(sql, ())
+                for node in nodes:
+                    if (name, sql, node) in regressions:
+                        self.stdout.write(self.style.ERROR(f'  + {node}'))
+                    else:
+                        self.stdout.write(f'    {node}')
+                for node in sorted(set(expected.get(sql, ())) - set(nodes)):
+                    self.stdout.write(self.style.SUCCESS(f'  - {node}'))
+        return len(regressions)
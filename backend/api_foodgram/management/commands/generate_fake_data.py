@@ -0,0 +1,226 @@
+import random
+import time
+import uuid
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from api_foodgram import feed
+from api_foodgram.counters import reconcile
+from api_foodgram.models import (FeedEntry, Ingredient, Recipe,
+                                 RecipeIngredients, ShoppingCart,
+                                 ShoppingListItem, Tag, UserFavorite)
+from api_foodgram.shopping_list import compute_shopping_list
+from users.models import Subscription
+
+User = get_user_model()
+
+FAKE_PREFIX = 'fake_'
+FAKE_PASSWORD = 'fake-password'
+FAKE_IMAGE = 'recipes/images/fake.png'
+DEFAULT_TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+    ('Десерт', '#F4A7BB', 'dessert'),
+    ('Выпечка', '#C49A6C', 'bakery'),
+    ('Веган', '#2E8B57', 'vegan'),
+)
+WORDS = ('суп', 'салат', 'пирог', 'рагу', 'каша', 'запеканка', 'омлет',
+         'паста', 'плов', 'жаркое', 'оладьи', 'котлеты', 'борщ', 'крем')
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = ('Генерация синтетических пользователей, рецептов, подписок, '
+            'избранного и списков покупок для нагрузочных замеров')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=500)
+        parser.add_argument('--subscriptions', type=int, default=10,
+                            help='Подписок на пользователя')
+        parser.add_argument('--favorites', type=int, default=20,
+                            help='Рецептов в избранном на пользователя')
+        parser.add_argument('--cart', type=int, default=5,
+                            help='Рецептов в списке покупок на пользователя')
+        parser.add_argument('--min-ingredients', type=int, default=3)
+        parser.add_argument('--max-ingredients', type=int, default=12)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--clear', action='store_true',
+                            help='Удалить ранее сгенерированные данные')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        started = time.monotonic()
+        if options['clear']:
+            self.clear()
+        ingredient_ids = self.get_ingredient_ids()
+        tag_ids = self.get_tag_ids()
+        with transaction.atomic():
+            user_ids = self.create_users(options['users'])
+            recipe_ids = self.create_recipes(
+                options['recipes'], user_ids, tag_ids, ingredient_ids,
+                options['min_ingredients'], options['max_ingredients'])
+            self.create_relations(
+                Subscription, 'author_id', user_ids, user_ids,
+                options['subscriptions'], exclude_self=True)
+            self.create_relations(
+                UserFavorite, 'recipe_id', user_ids, recipe_ids,
+                options['favorites'])
+            self.create_relations(
+                ShoppingCart, 'recipe_id', user_ids, recipe_ids,
+                options['cart'])
+            self.create_shopping_lists(user_ids)
+            self.update_counters(user_ids, recipe_ids)
+            self.create_feeds(user_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Сгенерировано за {time.monotonic() - started:.1f} с'))
+
+    @staticmethod
+    def delete_rows(queryset):
+        """Удаляет строки queryset одним DELETE ... WHERE pk IN (...),
+        без сбора объектов каскадом и без сигналов: иначе очистка
+        миллиона строк занимает часы."""
+        meta = queryset.model._meta
+        quote = connection.ops.quote_name
+        sql, params = (queryset.order_by().values('pk')
+                       .query.sql_with_params())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {quote(meta.db_table)} '
+                f'WHERE {quote(meta.pk.column)} IN ({sql})', params)
+
+    def clear(self):
+        fake_users = User.objects.filter(username__startswith=FAKE_PREFIX)
+        fake_recipes = Recipe.objects.filter(author__in=fake_users)
+        querysets = (
+            ShoppingCart.objects.filter(recipe__in=fake_recipes),
+            ShoppingCart.objects.filter(user__in=fake_users),
+            UserFavorite.objects.filter(recipe__in=fake_recipes),
+            UserFavorite.objects.filter(user__in=fake_users),
+            ShoppingListItem.objects.filter(user__in=fake_users),
+            FeedEntry.objects.filter(recipe__in=fake_recipes),
+            FeedEntry.objects.filter(user__in=fake_users),
+            Subscription.objects.filter(author__in=fake_users),
+            Subscription.objects.filter(user__in=fake_users),
+            RecipeIngredients.objects.filter(recipe__in=fake_recipes),
+            Recipe.tags.through.objects.filter(recipe__in=fake_recipes),
+            fake_recipes,
+            User.objects.filter(username__startswith=FAKE_PREFIX),
+        )
+        with transaction.atomic():
+            for queryset in querysets:
+                self.delete_rows(queryset)
+        self.stdout.write('Ранее сгенерированные данные удалены')
+
+    def get_ingredient_ids(self):
+        if not Ingredient.objects.exists():
+            call_command('load_csv_data')
+        return list(Ingredient.objects.values_list('id', flat=True))
+
+    def get_tag_ids(self):
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=name, color=color, slug=slug)
+                for name, color, slug in DEFAULT_TAGS)
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def bulk_create(self, model, objects):
+        created = []
+        for batch in batched(objects, self.batch_size):
+            created.extend(model.objects.bulk_create(batch))
+        return created
+
+    def create_users(self, count):
+        run = uuid.uuid4().hex[:8]
+        password = make_password(FAKE_PASSWORD)
+        users = self.bulk_create(User, (
+            User(username=f'{FAKE_PREFIX}{run}_{number}',
+                 email=f'{FAKE_PREFIX}{run}_{number}@example.com',
+                 first_name='Имя',
+                 last_name='Фамилия',
+                 password=password)
+            for number in range(count)))
+        self.stdout.write(f'Пользователей: {len(users)}')
+        return [user.pk for user in users]
+
+    def create_recipes(self, count, user_ids, tag_ids, ingredient_ids,
+                       min_ingredients, max_ingredients):
+        recipe_ids = []
+        tags_through = Recipe.tags.through
+        for batch in batched(range(count), self.batch_size):
+            recipes = Recipe.objects.bulk_create(
+                Recipe(name=self.random.choice(WORDS) + f' №{number}',
+                       text='Синтетический рецепт для нагрузочных замеров',
+                       image=FAKE_IMAGE,
+                       cooking_time=self.random.randint(5, 180),
+                       author_id=self.random.choice(user_ids))
+                for number in batch)
+            self.bulk_create(tags_through, (
+                tags_through(recipe_id=recipe.pk, tag_id=tag_id)
+                for recipe in recipes
+                for tag_id in self.random.sample(
+                    tag_ids, self.random.randint(1, min(3, len(tag_ids))))))
+            self.bulk_create(RecipeIngredients, (
+                RecipeIngredients(recipe_id=recipe.pk,
+                                  ingredient_id=ingredient_id,
+                                  amount=self.random.randint(1, 500))
+                for recipe in recipes
+                for ingredient_id in self.random.sample(
+                    ingredient_ids,
+                    self.random.randint(min_ingredients, max_ingredients))))
+            recipe_ids.extend(recipe.pk for recipe in recipes)
+            self.stdout.write(f'Рецептов: {len(recipe_ids)}/{count}')
+        return recipe_ids
+
+    def create_relations(self, model, target_field, user_ids, target_ids,
+                         per_user, exclude_self=False):
+        per_user = min(per_user, len(target_ids) - int(exclude_self))
+        if per_user <= 0:
+            return
+
+        def relations():
+            sample_size = min(per_user + int(exclude_self), len(target_ids))
+            for user_id in user_ids:
+                targets = self.random.sample(target_ids, sample_size)
+                if exclude_self and user_id in targets:
+                    targets.remove(user_id)
+                for target_id in targets[:per_user]:
+                    yield model(user_id=user_id, **{target_field: target_id})
+
+        created = self.bulk_create(model, relations())
+        self.stdout.write(f'{model._meta.verbose_name_plural}: {len(created)}')
+
+    def create_shopping_lists(self, user_ids):
+        created = 0
+        for batch in batched(user_ids, self.batch_size):
+            created += len(self.bulk_create(ShoppingListItem, (
+                ShoppingListItem(**row)
+                for row in compute_shopping_list(batch).iterator())))
+        self.stdout.write(
+            f'{ShoppingListItem._meta.verbose_name_plural}: {created}')
+
+    def update_counters(self, user_ids, recipe_ids):
+        # bulk_create обходит обновление счётчиков, а связи создаются
+        # только между новыми объектами - их и пересчитываем.
+        for model, pks in ((User, user_ids), (Recipe, recipe_ids)):
+            for batch in batched(pks, self.batch_size):
+                reconcile(model, batch)
+
+    def create_feeds(self, user_ids):
+        created = sum(feed.rebuild(batch)
+                      for batch in batched(user_ids, self.batch_size))
+        self.stdout.write(
+            f'{FeedEntry._meta.verbose_name_plural}: {created}')
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from api_foodgram.images import make_variants
+from api_foodgram.models import Recipe
+
+
+class Command(BaseCommand):
+    help = ('Построение уменьшенных WebP-копий изображений для рецептов, '
+            'у которых их ещё нет')
+
+    def handle(self, *args, **options):
+        recipes = (Recipe.objects
+                   .exclude(image='')
+                   .filter(Q(image_card='') | Q(image_detail=''))
+                   .values_list('id', 'image_card', 'image_detail'))
+        done = 0
+        for recipe_id, *stale_names in recipes.iterator():
+            try:
+                make_variants(recipe_id, stale_names)
+            except OSError as error:
+                self.stderr.write(f'Рецепт {recipe_id}: {error}')
+                continue
+            done += 1
+        self.stdout.write(self.style.SUCCESS(f'Обработано рецептов: {done}'))
@@ -1,21 +1,94 @@
 import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from api_foodgram.models import Ingredient
+from api_foodgram.search import ingredient_index
+
+DEFAULT_PATH = 'data/ingredients_load.csv'
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    """Строки (название, единица измерения) из CSV с заголовком
+    name,measurement_unit или без заголовка."""
+    reader = csv.reader(file)
+    first_row = next(reader, None)
+    if first_row is None:
+        return
+    if 'name' in first_row and 'measurement_unit' in first_row:
+        name_index = first_row.index('name')
+        unit_index = first_row.index('measurement_unit')
+    else:
+        name_index, unit_index = 0, 1
+        yield first_row[name_index], first_row[unit_index]
+    for row in reader:
+        if row:
+            yield row[name_index], row[unit_index]
+
+
+def read_json(file):
+    """Потоково разбирает JSON-массив объектов, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(JSON_CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Ожидается JSON-массив ингредиентов')
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = file.read(JSON_CHUNK_SIZE)
+            if not chunk:
+                raise CommandError('Файл JSON оборван')
+            buffer += chunk
+            continue
+        yield item['name'], item['measurement_unit']
+        buffer = buffer[end:]
 
 
 class Command(BaseCommand):
-    help = 'Загрузка данных из csv файла в БД'
+    help = ('Загрузка ингредиентов из CSV или JSON файла в БД. '
+            'Повторная загрузка не создаёт дубликатов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=DEFAULT_PATH)
+        parser.add_argument('--format', choices=('csv', 'json'),
+                            help='По умолчанию определяется по расширению')
+        parser.add_argument('--batch-size', type=int, default=1000)
 
     def handle(self, *args, **options):
-        with open(
-                'data/ingredients_load.csv', 'r',
-                encoding='utf-8') as file:
-            csv_reader = csv.DictReader(file)
-            for row in csv_reader:
-                ingredients = Ingredient(
-                    name=row['name'],
-                    measurement_unit=row['measurement_unit'])
-                ingredients.save()
-            self.stdout.write(self.style.SUCCESS(
-                'ingredients.csv загружен в базу данных'))
+        path = Path(options['path'])
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        readers = {'csv': read_csv, 'json': read_json}
+        if file_format not in readers:
+            raise CommandError(f'Неизвестный формат файла: {path}')
+        started = time.monotonic()
+        rows_total = 0
+        count_before = Ingredient.objects.count()
+        with open(path, 'r', encoding='utf-8') as file, transaction.atomic():
+            rows = (
+                Ingredient(name=name.strip(),
+                           measurement_unit=measurement_unit.strip())
+                for name, measurement_unit in readers[file_format](file)
+                if name.strip())
+            while batch := list(islice(rows, options['batch_size'])):
+                Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+                rows_total += len(batch)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'Обработано строк: {rows_total} '
+                    f'({rows_total / elapsed:.0f} строк/с)')
+        ingredient_index.invalidate()
+        created = Ingredient.objects.count() - count_before
+        self.stdout.write(self.style.SUCCESS(
+            f'{path.name} загружен в базу данных: добавлено {created}, '
+            f'уже существовало {rows_total - created}, '
+            f'{time.monotonic() - started:.1f} с'))
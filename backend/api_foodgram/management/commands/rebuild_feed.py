@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api_foodgram import feed
+
+from .generate_fake_data import batched
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересборка лент подписок всех пользователей с нуля'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Пользователей за одну транзакцию')
+
+    def handle(self, *args, **options):
+        user_ids = User.objects.order_by('id').values_list('id', flat=True)
+        created = 0
+        for batch in batched(user_ids.iterator(), options['batch_size']):
+            with transaction.atomic():
+                created += feed.rebuild(batch)
+        self.stdout.write(self.style.SUCCESS(f'Записей ленты: {created}'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api_foodgram.counters import COUNTERS, reconcile
+
+from .generate_fake_data import batched
+
+
+class Command(BaseCommand):
+    help = ('Пересчёт хранимых счётчиков рецептов, избранного, списков '
+            'покупок и подписок и исправление расхождений')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Объектов за одну проверку')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать число расхождений')
+
+    def handle(self, *args, **options):
+        verb = 'найдено' if options['dry_run'] else 'исправлено'
+        for model in COUNTERS:
+            pks = model.objects.order_by('pk').values_list('pk', flat=True)
+            changed = 0
+            for batch in batched(pks.iterator(), options['batch_size']):
+                with transaction.atomic():
+                    changed += reconcile(model, batch, options['dry_run'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural}: {verb} {changed}'))
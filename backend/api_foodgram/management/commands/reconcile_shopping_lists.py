@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api_foodgram.models import ShoppingListItem
+from api_foodgram.shopping_list import compute_shopping_list
+
+from .generate_fake_data import batched
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Сверка сохранённых списков покупок с рецептами в списках '
+            'покупок и исправление расхождений')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Пользователей за одну проверку')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать число расхождений')
+
+    def handle(self, *args, **options):
+        user_ids = User.objects.order_by('id').values_list('id', flat=True)
+        totals = {'created': 0, 'updated': 0, 'deleted': 0}
+        for batch in batched(user_ids.iterator(), options['batch_size']):
+            with transaction.atomic():
+                changes = self.reconcile(batch, options['dry_run'])
+            for key, count in changes.items():
+                totals[key] += count
+        verb = 'Найдено' if options['dry_run'] else 'Исправлено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb}: добавить {totals["created"]}, '
+            f'изменить {totals["updated"]}, удалить {totals["deleted"]}'))
+
+    def reconcile(self, user_ids, dry_run):
+        expected = {
+            (row['user_id'], row['ingredient_id']): row['amount']
+            for row in compute_shopping_list(user_ids)}
+        stored = {
+            (item.user_id, item.ingredient_id): item
+            for item in ShoppingListItem.objects
+            .select_for_update()
+            .filter(user_id__in=user_ids)}
+        missing = [
+            ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id,
+                             amount=amount)
+            for (user_id, ingredient_id), amount in expected.items()
+            if (user_id, ingredient_id) not in stored]
+        changed, extra = [], []
+        for key, item in stored.items():
+            if key not in expected:
+                extra.append(item.pk)
+            elif item.amount != expected[key]:
+                item.amount = expected[key]
+                changed.append(item)
+        if not dry_run:
+            ShoppingListItem.objects.bulk_create(missing)
+            ShoppingListItem.objects.bulk_update(changed, ['amount'])
+            ShoppingListItem.objects.filter(pk__in=extra).delete()
+        return {'created': len(missing), 'updated': len(changed),
+                'deleted': len(extra)}
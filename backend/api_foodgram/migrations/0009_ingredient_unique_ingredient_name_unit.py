@@ -0,0 +1,53 @@
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('api_foodgram', 'Ingredient')
+    RecipeIngredients = apps.get_model('api_foodgram', 'RecipeIngredients')
+    duplicates = (Ingredient.objects
+                  .values('name', 'measurement_unit')
+                  .annotate(keep_id=Min('id'), total=Count('id'))
+                  .filter(total__gt=1)
+                  .order_by())
+    for group in duplicates:
+        extra = Ingredient.objects.filter(
+            name=group['name'],
+            measurement_unit=group['measurement_unit']
+        ).exclude(id=group['keep_id'])
+        # Рецепт мог ссылаться на несколько дубликатов: оставляем одну
+        # строку на рецепт с суммарным количеством.
+        kept = {}
+        for row in RecipeIngredients.objects.filter(
+                ingredient__name=group['name'],
+                ingredient__measurement_unit=group['measurement_unit']
+        ).order_by('id'):
+            if row.recipe_id in kept:
+                kept[row.recipe_id].amount += row.amount
+                row.delete()
+            else:
+                kept[row.recipe_id] = row
+        for row in kept.values():
+            row.ingredient_id = group['keep_id']
+            row.save(update_fields=['ingredient', 'amount'])
+        extra.delete()
+    if schema_editor.connection.vendor == 'postgresql':
+        # Удаления оставили отложенные проверки внешних ключей, а с ними
+        # PostgreSQL не даёт выполнить ALTER TABLE в той же транзакции.
+        schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_foodgram', '0008_ingredient_name_trgm_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_ingredients,
+                             migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient_name_unit'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:12
+
+from django.db import migrations, models
+from django.db.models import Count, F, Min, Sum
+
+
+def _delete_duplicates(model):
+    """Оставляет самую раннюю запись каждой пары (user, recipe) и
+    возвращает id пользователей, у которых были дубликаты."""
+    duplicates = (model.objects
+                  .values('user_id', 'recipe_id')
+                  .annotate(keep_id=Min('id'), count=Count('id'))
+                  .filter(count__gt=1)
+                  .order_by())
+    user_ids = set()
+    for row in duplicates.iterator():
+        model.objects.filter(
+            user_id=row['user_id'], recipe_id=row['recipe_id']
+        ).exclude(id=row['keep_id']).delete()
+        user_ids.add(row['user_id'])
+    return user_ids
+
+
+def delete_duplicates(apps, schema_editor):
+    ShoppingCart = apps.get_model('api_foodgram', 'ShoppingCart')
+    UserFavorite = apps.get_model('api_foodgram', 'UserFavorite')
+    ShoppingListItem = apps.get_model('api_foodgram', 'ShoppingListItem')
+    _delete_duplicates(UserFavorite)
+    user_ids = _delete_duplicates(ShoppingCart)
+    if not user_ids:
+        return
+    # Дубликаты в списке покупок удваивали количества, поэтому списки
+    # этих пользователей пересчитываются заново.
+    ShoppingListItem.objects.filter(user_id__in=user_ids).delete()
+    rows = (ShoppingCart.objects
+            .filter(user_id__in=user_ids,
+                    recipe__recipe_ingredients__isnull=False)
+            .values('user_id',
+                    ingredient_id=F('recipe__recipe_ingredients__ingredient'))
+            .annotate(amount=Sum('recipe__recipe_ingredients__amount'))
+            .order_by())
+    ShoppingListItem.objects.bulk_create(
+        (ShoppingListItem(**row) for row in rows.iterator()),
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_foodgram', '0011_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='shoppingcart',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_shopping_cart'),
+        ),
+        migrations.AddConstraint(
+            model_name='userfavorite',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_user_favorite'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:08
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(model, field):
+    return Coalesce(Subquery(
+        model.objects
+        .filter(**{field: OuterRef('pk')})
+        .order_by().values(field)
+        .annotate(count=Count('pk')).values('count')), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('api_foodgram', 'Recipe')
+    UserFavorite = apps.get_model('api_foodgram', 'UserFavorite')
+    ShoppingCart = apps.get_model('api_foodgram', 'ShoppingCart')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Subscription = apps.get_model('users', 'Subscription')
+    Recipe.objects.update(
+        favorites_count=_count(UserFavorite, 'recipe'),
+        carts_count=_count(ShoppingCart, 'recipe'))
+    User.objects.update(
+        recipes_count=_count(Recipe, 'author'),
+        followers_count=_count(Subscription, 'author'),
+        following_count=_count(Subscription, 'user'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_foodgram', '0013_recipe_indexes'),
+        ('users', '0004_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в список покупок'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в избранное'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
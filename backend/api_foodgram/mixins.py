@@ -0,0 +1,78 @@
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.http import Http404
+from django.utils.cache import (get_conditional_response, patch_vary_headers,
+                                quote_etag)
+from django.utils.http import http_date
+
+
+class ConditionalGetMixin:
+    """Условные GET-запросы (ETag / Last-Modified) для list и retrieve.
+
+    Валидаторы считаются дешёвыми агрегатами по updated_at, и если клиент
+    уже получил актуальную версию, ответ 304 отдаётся без сериализации.
+    Last-Modified выставляется только для отдельных объектов: удаление
+    строки из списка не меняет максимальную дату изменения.
+    """
+    vary_on_user = False
+
+    def get_validators_queryset(self):
+        return self.filter_queryset(self.get_queryset())
+
+    def get_list_validators(self):
+        """Возвращает (части ETag, Last-Modified) для списка."""
+        state = self.get_validators_queryset().aggregate(
+            count=Count('pk'), last=Max('updated_at'))
+        return [state['count'], state['last']], None
+
+    def get_detail_validators(self):
+        """Возвращает (части ETag, Last-Modified) для объекта."""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            last = (self.get_validators_queryset()
+                    .filter(**{self.lookup_field:
+                               self.kwargs[lookup_url_kwarg]})
+                    # Объект один: сортировка по умолчанию не нужна.
+                    .order_by()
+                    .values_list('updated_at', flat=True)
+                    .first())
+        except (TypeError, ValueError, ValidationError):
+            # Как get_object_or_404 в DRF: некорректный id - это 404.
+            raise Http404
+        if last is None:
+            return None, None
+        return [last], last
+
+    def conditional_response(self, validators, handler, request, *args,
+                             **kwargs):
+        etag_parts, last_modified = validators
+        etag = last_modified_timestamp = None
+        if etag_parts is not None:
+            etag = quote_etag(hashlib.md5(
+                ':'.join(map(str, etag_parts)).encode()).hexdigest())
+        if last_modified is not None:
+            last_modified_timestamp = int(last_modified.timestamp())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified_timestamp)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            if etag is not None:
+                response['ETag'] = etag
+            if last_modified_timestamp is not None:
+                response['Last-Modified'] = http_date(last_modified_timestamp)
+        if self.vary_on_user:
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.get_list_validators(), super().list,
+            request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.get_detail_validators(), super().retrieve,
+            request, *args, **kwargs)
@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
 from django.core.validators import MinValueValidator
 from django.db import models
 
@@ -24,6 +25,9 @@ class Tag(models.Model):
         max_length=MAX_LENGTH,
         unique=True,
         blank=False)
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True)
 
     class Meta:
         verbose_name = 'Тэг'
@@ -44,10 +48,25 @@ class Ingredient(models.Model):
         'Единица измерения',
         max_length=MAX_LENGTH,
         blank=False)
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True)
 
     class Meta:
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient_name_unit'
+            )
+        ]
+        indexes = [
+            GinIndex(
+                fields=['name'],
+                name='ingredient_name_trgm_idx',
+                opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self):
         return self.name
@@ -71,6 +90,14 @@ class Recipe(models.Model):
         upload_to='recipes/images/',
         blank=False,
     )
+    image_card = models.ImageField(
+        'Изображение для ленты',
+        upload_to='recipes/images/card/',
+        blank=True)
+    image_detail = models.ImageField(
+        'Изображение для страницы рецепта',
+        upload_to='recipes/images/detail/',
+        blank=True)
     text = models.TextField(
         'Текстовое описание', blank=False)
     cooking_time = models.PositiveIntegerField(
@@ -85,11 +112,32 @@ class Recipe(models.Model):
         'Дата создания',
         auto_now_add=True,
         blank=False)
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True)
+    favorites_count = models.PositiveIntegerField(
+        'Добавлений в избранное',
+        default=0,
+        editable=False)
+    carts_count = models.PositiveIntegerField(
+        'Добавлений в список покупок',
+        default=0,
+        editable=False)
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-created_at',)
+        indexes = [
+            # Лента и курсорная пагинация: ORDER BY created_at DESC, id DESC.
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='recipe_created_at_idx'),
+            # Рецепты автора (?author=, подписки) в том же порядке.
+            models.Index(
+                fields=['author', '-created_at', '-id'],
+                name='recipe_author_created_at_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -115,11 +163,47 @@ class ShoppingCart(models.Model):
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
         ordering = ('-created_at',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_shopping_cart'
+            )
+        ]
 
     def __str__(self):
         return f'{self.user} добавил в список покупки {self.recipe}'
 
 
+class ShoppingListItem(models.Model):
+    """Итоговое количество ингредиента в списке покупок пользователя"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Пользователь')
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент')
+    amount = models.PositiveIntegerField(
+        'Количество',
+        default=0)
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списка покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_item'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.ingredient}: {self.amount}'
+
+
 class UserFavorite(models.Model):
     """Модель избранного для пользователя"""
     user = models.ForeignKey(
@@ -139,11 +223,61 @@ class UserFavorite(models.Model):
         verbose_name = 'Избранное'
         verbose_name_plural = 'Избранное'
         ordering = ('-created_at',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_user_favorite'
+            )
+        ]
 
     def __str__(self):
         return f'{self.user} добавил в избранное {self.recipe}'
 
 
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписок пользователя"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Подписчик')
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор рецепта')
+    created_at = models.DateTimeField(
+        verbose_name='Дата публикации рецепта')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'
+            )
+        ]
+        indexes = [
+            # Удаление записей автора при отписке.
+            models.Index(
+                fields=['user', 'author'],
+                name='feed_entry_user_author_idx'),
+            # Страница ленты: ORDER BY created_at DESC, recipe_id DESC.
+            models.Index(
+                fields=['user', '-created_at', '-recipe'],
+                name='feed_entry_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} в ленте {self.user}'
+
+
 class RecipeIngredients(models.Model):
     """Модель списка ингредиентов для рецепта"""
     recipe = models.ForeignKey(
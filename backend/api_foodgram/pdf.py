@@ -0,0 +1,61 @@
+"""Выгрузка списка покупок в PDF.
+
+Шрифт регистрируется один раз при запуске приложения, а документ
+пишется во временный файл, который держится в памяти только до
+PDF_SPOOL_MAX_SIZE байт. ShoppingListPDFRenderer читает готовый файл в
+байты, которые кэшируются (documents.py) и отдаются обычным
+HttpResponse.
+"""
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from .shopping_list import item_text
+
+SHOPPING_LIST_TITLE = 'Список покупок'
+FONT_NAME = 'Arial'
+FONT_SIZE = 12
+TITLE_FONT_SIZE = 16
+LINE_HEIGHT = 20
+MARGIN = 60
+
+
+def register_fonts():
+    if FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(
+            TTFont(FONT_NAME, str(settings.FONT_PATH / 'arial.ttf')))
+
+
+def _start_page(pdf, title, page):
+    width, height = A4
+    pdf.setFont(FONT_NAME, TITLE_FONT_SIZE)
+    pdf.drawCentredString(width / 2, height - MARGIN, title)
+    pdf.setFont(FONT_NAME, FONT_SIZE - 2)
+    pdf.drawRightString(width - MARGIN, MARGIN / 2, f'стр. {page}')
+    pdf.setFont(FONT_NAME, FONT_SIZE)
+    return height - MARGIN - 2 * LINE_HEIGHT
+
+
+def render_shopping_list(items, title=SHOPPING_LIST_TITLE):
+    """Постраничный PDF из строк get_shopping_list, файл открыт на начале."""
+    register_fonts()
+    file = SpooledTemporaryFile(max_size=settings.PDF_SPOOL_MAX_SIZE)
+    pdf = canvas.Canvas(file, pagesize=A4, pageCompression=1)
+    pdf.setTitle(title)
+    page = 1
+    y_coordinate = _start_page(pdf, title, page)
+    for item in items:
+        if y_coordinate < MARGIN:
+            pdf.showPage()
+            page += 1
+            y_coordinate = _start_page(pdf, title, page)
+        pdf.drawString(MARGIN, y_coordinate, item_text(item))
+        y_coordinate -= LINE_HEIGHT
+    pdf.showPage()
+    pdf.save()
+    file.seek(0)
+    return file
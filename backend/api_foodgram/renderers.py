@@ -0,0 +1,63 @@
+"""Форматы выгрузки списка покупок.
+
+Формат выбирается по ?format= или заголовку Accept. CSV и текст
+отдаются потоком строк через stream(), PDF строится ReportLab.
+"""
+import csv
+
+from rest_framework.renderers import BaseRenderer
+
+from .pdf import render_shopping_list
+from .shopping_list import item_text
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """Документ со списком покупок, а не JSON API."""
+
+
+class ShoppingListPDFRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with render_shopping_list(data) as file:
+            return file.read()
+
+
+class ShoppingListStreamRenderer(ShoppingListRenderer):
+
+    def stream(self, items):
+        raise NotImplementedError
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return ''.join(self.stream(data)).encode(self.charset)
+
+
+class Echo:
+    """Файлоподобный объект для csv.writer, который возвращает строку."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListCSVRenderer(ShoppingListStreamRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    header = ('name', 'measurement_unit', 'amount')
+
+    def stream(self, items):
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.header)
+        for item in items:
+            yield writer.writerow([item[field] for field in self.header])
+
+
+class ShoppingListTextRenderer(ShoppingListStreamRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, items):
+        for item in items:
+            yield item_text(item) + '\n'
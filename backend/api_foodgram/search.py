@@ -0,0 +1,94 @@
+"""Поиск ингредиентов по началу названия в памяти процесса.
+
+Каталог ингредиентов практически не меняется, поэтому вместо запроса
+ILIKE 'x%' на каждое нажатие клавиши названия держатся в отсортированном
+списке, а поиск префикса идёт бинарным поиском. Индекс загружается при
+первом обращении, сбрасывается сигналами при изменении Ingredient в
+текущем процессе и не реже раза в INGREDIENT_INDEX_TTL секунд сверяется
+с БД (количество строк и последняя дата изменения) - это покрывает
+изменения, сделанные в других процессах.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connection
+from django.db.models import Count, Max
+
+from .models import Ingredient
+
+
+class IngredientPrefixIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._checked_at = 0.0
+
+    @staticmethod
+    def _fingerprint():
+        state = Ingredient.objects.aggregate(
+            count=Count('pk'), last=Max('updated_at'))
+        return state['count'], state['last']
+
+    def _load(self, fingerprint):
+        rows = sorted(
+            Ingredient.objects.values_list('name', 'id', 'measurement_unit'),
+            key=lambda row: (row[0].casefold(), row[1]))
+        keys = [name.casefold() for name, _, _ in rows]
+        items = [{'id': pk, 'name': name, 'measurement_unit': unit}
+                 for name, pk, unit in rows]
+        return fingerprint, keys, items
+
+    def _get_snapshot(self):
+        snapshot = self._snapshot
+        if (snapshot is not None and time.monotonic() - self._checked_at
+                < settings.INGREDIENT_INDEX_TTL):
+            return snapshot
+        with self._lock:
+            # Снимок мог обновить другой поток или сбросить invalidate().
+            current = self._snapshot
+            if current is not snapshot and current is not None:
+                return current
+            snapshot = current
+            fingerprint = self._fingerprint()
+            if snapshot is None or snapshot[0] != fingerprint:
+                snapshot = self._snapshot = self._load(fingerprint)
+            self._checked_at = time.monotonic()
+        return snapshot
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def search(self, prefix, limit=None):
+        """Ингредиенты, название которых начинается с prefix (без учёта
+        регистра), в алфавитном порядке; не более limit штук."""
+        _, keys, items = self._get_snapshot()
+        prefix = prefix.strip().casefold()
+        results = []
+        for position in range(bisect_left(keys, prefix), len(keys)):
+            if not keys[position].startswith(prefix) or (
+                    limit is not None and len(results) >= limit):
+                break
+            results.append(items[position])
+        return results
+
+
+ingredient_index = IngredientPrefixIndex()
+
+
+def fuzzy_search(query, limit):
+    """Поиск с опечатками: сначала совпадения по началу названия, затем
+    остальные ингредиенты по убыванию триграммного сходства (pg_trgm,
+    GIN-индекс ingredient_name_trgm_idx). Не более limit результатов."""
+    results = ingredient_index.search(query, limit)
+    if len(results) >= limit or connection.vendor != 'postgresql':
+        return results
+    similar = (Ingredient.objects
+               .filter(name__trigram_word_similar=query)
+               .exclude(pk__in=[item['id'] for item in results])
+               .annotate(similarity=TrigramWordSimilarity(query, 'name'))
+               .order_by('-similarity', 'name')
+               .values('id', 'name', 'measurement_unit'))
+    return results + list(similar[:limit - len(results)])
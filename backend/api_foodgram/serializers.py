@@ -1,31 +1,72 @@
 import base64
+import binascii
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.base import ContentFile
+from django.db import transaction
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
 from users.serializers import CustomUserSerializer
 
+from . import counters, feed, shopping_list
+from .images import VARIANTS, schedule_variants
 from .models import (Ingredient, Recipe, RecipeIngredients, ShoppingCart, Tag,
                      UserFavorite)
 
 User = get_user_model()
 MAX_INGREDIENTS = 30
+MAX_BATCH_SIZE = 100
 
 MAX_TIME = 1200
 
 
 class Base64ImageField(serializers.ImageField):
+    default_error_messages = {
+        'too_large': 'Размер изображения не должен превышать {max_size} байт.',
+    }
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
+            format, _, imgstr = data.partition(';base64,')
             ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
-
+            # Размер известен до декодирования: 4 символа base64 - 3 байта.
+            if len(imgstr) * 3 // 4 > settings.RECIPE_IMAGE_MAX_SIZE:
+                self.fail('too_large',
+                          max_size=settings.RECIPE_IMAGE_MAX_SIZE)
+            try:
+                data = ContentFile(base64.b64decode(imgstr, validate=True),
+                                   name='temp.' + ext)
+            except binascii.Error:
+                self.fail('invalid_image')
+        if getattr(data, 'size', 0) > settings.RECIPE_IMAGE_MAX_SIZE:
+            self.fail('too_large', max_size=settings.RECIPE_IMAGE_MAX_SIZE)
         return super().to_internal_value(data)
 
 
+class RecipeImagesField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные копии изображения рецепта. Пока копии
+    строятся в фоне, вместо них отдаётся оригинал."""
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        request = self.context.get('request')
+        images = {}
+        for key, (field, _) in VARIANTS.items():
+            image = getattr(recipe, field) or recipe.image
+            if not image:
+                images[key] = None
+            elif request is not None:
+                images[key] = request.build_absolute_uri(image.url)
+            else:
+                images[key] = image.url
+        return images
+
+
 class RecipeUserSerializer(CustomUserSerializer):
     class Meta:
         model = User
@@ -63,7 +104,10 @@ class TagSerializer(serializers.ModelSerializer):
 class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ingredient
-        fields = '__all__'
+        fields = (
+            'id',
+            'name',
+            'measurement_unit')
 
 
 class IngredientsRecipeCreateSerializer(serializers.ModelSerializer):
@@ -73,9 +117,9 @@ class IngredientsRecipeCreateSerializer(serializers.ModelSerializer):
         source='ingredient.measurement_unit')
     name = serializers.StringRelatedField(
         source='ingredient.name')
-    id = serializers.PrimaryKeyRelatedField(
-        source='ingredient',
-        queryset=Ingredient.objects.all())
+    # Существование ингредиентов проверяется одним запросом в
+    # RecipeCreateUpdateSerializer.validate_ingredients.
+    id = serializers.IntegerField(source='ingredient_id')
 
     class Meta:
         model = RecipeIngredients
@@ -102,12 +146,15 @@ class IngredientRecipeResponseSerializer(serializers.ModelSerializer):
 
 
 class RecipeReadSerializer(serializers.ModelSerializer):
+    images = RecipeImagesField()
+
     class Meta:
         model = Recipe
         fields = (
             'id',
             'name',
             'image',
+            'images',
             'cooking_time')
         read_only_fields = (
             'id',
@@ -118,6 +165,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
 
 class RecipeBaseSerializer(serializers.ModelSerializer):
     image = Base64ImageField()
+    images = RecipeImagesField()
     tags = TagSerializer(
         many=True)
     author = RecipeUserSerializer(
@@ -129,7 +177,10 @@ class RecipeBaseSerializer(serializers.ModelSerializer):
     is_in_shopping_cart = serializers.SerializerMethodField(
         read_only=True)
 
-    def _object_exists(self, instance, target_model):
+    def _object_exists(self, instance, target_model, annotation):
+        annotated = getattr(instance, annotation, None)
+        if annotated is not None:
+            return annotated
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
@@ -138,10 +189,11 @@ class RecipeBaseSerializer(serializers.ModelSerializer):
             recipe=instance).exists()
 
     def get_is_in_shopping_cart(self, instance):
-        return self._object_exists(instance, ShoppingCart)
+        return self._object_exists(
+            instance, ShoppingCart, 'is_in_shopping_cart')
 
     def get_is_favorited(self, instance):
-        return self._object_exists(instance, UserFavorite)
+        return self._object_exists(instance, UserFavorite, 'is_favorited')
 
     class Meta:
         model = Recipe
@@ -150,6 +202,7 @@ class RecipeBaseSerializer(serializers.ModelSerializer):
             'ingredients',
             'tags',
             'image',
+            'images',
             'name',
             'text',
             'cooking_time',
@@ -165,26 +218,55 @@ class RecipeCreateUpdateSerializer(RecipeBaseSerializer):
         source='recipe_ingredients', many=True, required=True)
 
     def _create_ingredients(self, values_list, recipe):
-        for item in values_list:
-            recipe_ingredients = RecipeIngredients(
-                **item, recipe=recipe
-            )
-            recipe_ingredients.save()
-
+        RecipeIngredients.objects.bulk_create(
+            RecipeIngredients(**item, recipe=recipe) for item in values_list)
+
+    def _update_ingredients(self, values_list, recipe):
+        """Пишет только отличия от текущего состава рецепта и возвращает
+        прежние и новые количества {id ингредиента: количество}."""
+        existing = {item.ingredient_id: item
+                    for item in recipe.recipe_ingredients.all()}
+        old_amounts = {pk: item.amount for pk, item in existing.items()}
+        amounts = {item['ingredient_id']: item['amount']
+                   for item in values_list}
+        to_create = [
+            RecipeIngredients(recipe=recipe, ingredient_id=pk, amount=amount)
+            for pk, amount in amounts.items() if pk not in existing]
+        to_update = []
+        for pk, item in existing.items():
+            if pk in amounts and item.amount != amounts[pk]:
+                item.amount = amounts[pk]
+                to_update.append(item)
+        removed = [pk for pk in existing if pk not in amounts]
+        RecipeIngredients.objects.bulk_create(to_create)
+        RecipeIngredients.objects.bulk_update(to_update, ['amount'])
+        if removed:
+            RecipeIngredients.objects.filter(
+                recipe=recipe, ingredient_id__in=removed).delete()
+        return old_amounts, amounts
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredients_list = validated_data.pop('recipe_ingredients')
         tags_list = validated_data.pop('tags')
         recipe = Recipe.objects.create(
             **validated_data)
         self._create_ingredients(ingredients_list, recipe)
-        for tag in tags_list:
-            recipe.tags.add(tag)
+        recipe.tags.set(tags_list)
+        counters.change(User, [recipe.author_id], 'recipes_count', 1)
+        schedule_variants(recipe)
+        feed.schedule_fan_out(recipe)
         return recipe
 
     def update(self, instance, validated_data):
         instance.name = validated_data.get('name', instance.name)
         instance.text = validated_data.get('text', instance.text)
-        instance.image = validated_data.get('image', instance.image)
+        stale_variants = ()
+        if 'image' in validated_data:
+            instance.image = validated_data['image']
+            stale_variants = (instance.image_card.name,
+                              instance.image_detail.name)
+            instance.image_card = instance.image_detail = ''
         instance.cooking_time = (
             validated_data.get('cooking_time', instance.cooking_time)
         )
@@ -198,17 +280,26 @@ class RecipeCreateUpdateSerializer(RecipeBaseSerializer):
             raise ValidationError(
                 'Поле тэг должно быть заполнено'
             )
-        instance.ingredients.clear()
-        instance.tags.clear()
-        self._create_ingredients(ingredients_list, instance)
-        for tag in tags_list:
-            instance.tags.add(tag)
-        instance.save()
+        with transaction.atomic():
+            old_amounts, new_amounts = self._update_ingredients(
+                ingredients_list, instance)
+            instance.tags.set(tags_list)
+            # Счётчики меняются только через F() в counters.py, а копии
+            # изображения пишет make_variants: полное сохранение записало
+            # бы их значения на момент чтения рецепта.
+            update_fields = ['name', 'text', 'cooking_time', 'updated_at']
+            if 'image' in validated_data:
+                update_fields += ['image', 'image_card', 'image_detail']
+            instance.save(update_fields=update_fields)
+            shopping_list.update_recipe(
+                instance.pk, old_amounts, new_amounts)
+            if 'image' in validated_data:
+                schedule_variants(instance, stale_variants)
         return instance
 
     def validate_ingredients(self, value):
 
-        items_list = [item.get('ingredient') for item in value]
+        items_list = [item.get('ingredient_id') for item in value]
         if len(set(items_list)) != len(items_list):
             raise ValidationError(
                 'Нельзя добавить 2 одинаковых ингредиента'
@@ -221,6 +312,13 @@ class RecipeCreateUpdateSerializer(RecipeBaseSerializer):
             raise ValidationError(
                 'Слишком много ингредиентов'
             )
+        missing = set(items_list) - set(
+            Ingredient.objects.filter(pk__in=items_list)
+            .values_list('pk', flat=True))
+        if missing:
+            raise ValidationError(
+                f'Ингредиенты не найдены: {sorted(missing)}'
+            )
         return value
 
     def validate_tags(self, value):
@@ -256,6 +354,16 @@ class RecipeResponseSerializer(RecipeBaseSerializer):
     pass
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BATCH_SIZE)
+
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
+
+
 class UserFavoriteSerializer(serializers.ModelSerializer):
     id = serializers.PrimaryKeyRelatedField(
         queryset=Recipe.objects.all())
@@ -280,9 +388,12 @@ class SubscriptionSerializer(CustomUserSerializer):
         read_only=True)
 
     def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj).count()
+        return obj.recipes_count
 
     def get_recipes(self, obj):
+        if hasattr(obj, 'preview_recipes'):
+            return RecipeReadSerializer(
+                obj.preview_recipes, many=True, read_only=True).data
         recipes_limit = self.context['request'].query_params.get(
             'recipes_limit', None)
         if recipes_limit:
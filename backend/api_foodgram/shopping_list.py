@@ -0,0 +1,113 @@
+"""Сводный список покупок пользователя.
+
+Итоги по ингредиентам хранятся в ShoppingListItem и меняются на разницу
+количеств при добавлении рецепта в список покупок, удалении из него и
+изменении ингредиентов рецепта, который уже лежит в чьих-то списках.
+Выгрузка читает готовую таблицу, а compute_shopping_list пересчитывает
+итоги с нуля для команды reconcile_shopping_lists.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from .models import (Ingredient, RecipeIngredients, ShoppingCart,
+                     ShoppingListItem)
+
+
+def get_shopping_list(user):
+    """Строки {'id', 'name', 'measurement_unit', 'amount'} по алфавиту."""
+    return (Ingredient.objects
+            .filter(shopping_list_items__user=user)
+            .values('id', 'name', 'measurement_unit',
+                    amount=F('shopping_list_items__amount'))
+            .order_by('name', 'measurement_unit'))
+
+
+def item_text(item):
+    return f"- {item['name']}: {item['amount']} {item['measurement_unit']}"
+
+
+def compute_shopping_list(user_ids=None):
+    """Итоги из рецептов в списках покупок, по строке на пользователя и
+    ингредиент: {'user_id', 'ingredient_id', 'amount'}."""
+    rows = ShoppingCart.objects.filter(
+        recipe__recipe_ingredients__isnull=False)
+    if user_ids is not None:
+        rows = rows.filter(user_id__in=user_ids)
+    return (rows
+            .values('user_id',
+                    ingredient_id=F('recipe__recipe_ingredients__ingredient'))
+            .annotate(amount=Sum('recipe__recipe_ingredients__amount'))
+            .order_by())
+
+
+def get_recipe_amounts(*recipe_ids):
+    """Суммарные количества ингредиентов рецептов."""
+    return Counter(dict(
+        RecipeIngredients.objects
+        .filter(recipe_id__in=recipe_ids)
+        .values_list('ingredient_id')
+        .annotate(Sum('amount'))
+        .order_by()))
+
+
+def get_cart_user_ids(recipe_id):
+    return (ShoppingCart.objects
+            .filter(recipe_id=recipe_id)
+            .values_list('user_id', flat=True))
+
+
+def apply_delta(user_ids, delta):
+    """Прибавляет delta {ingredient_id: количество} к спискам покупок
+    пользователей; позиции с нулевым итогом удаляются."""
+    delta = {pk: amount for pk, amount in delta.items() if amount}
+    user_ids = list(user_ids)
+    if not delta or not user_ids:
+        return
+    items = ShoppingListItem.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=delta)
+    with transaction.atomic():
+        ShoppingListItem.objects.bulk_create(
+            (ShoppingListItem(user_id=user_id, ingredient_id=pk)
+             for user_id in user_ids
+             for pk, amount in delta.items() if amount > 0),
+            ignore_conflicts=True)
+        items.update(amount=Greatest(
+            F('amount') + Case(
+                *(When(ingredient_id=pk, then=Value(amount))
+                  for pk, amount in delta.items()),
+                output_field=IntegerField()),
+            Value(0)))
+        items.filter(amount=0).delete()
+
+
+def add_recipes(recipe_ids, user_ids):
+    apply_delta(user_ids, get_recipe_amounts(*recipe_ids))
+
+
+def remove_recipes(recipe_ids, user_ids):
+    apply_delta(user_ids, {pk: -amount for pk, amount
+                           in get_recipe_amounts(*recipe_ids).items()})
+
+
+def add_recipe(recipe_id, user_ids):
+    add_recipes([recipe_id], user_ids)
+
+
+def remove_recipe(recipe_id, user_ids=None):
+    """Вычитает рецепт из списков покупок; по умолчанию у всех, у кого
+    он лежит в списке покупок, например перед удалением рецепта."""
+    if user_ids is None:
+        user_ids = get_cart_user_ids(recipe_id)
+    remove_recipes([recipe_id], user_ids)
+
+
+def update_recipe(recipe_id, old_amounts, new_amounts=None):
+    """Переносит в списки покупок изменение ингредиентов рецепта."""
+    if new_amounts is None:
+        new_amounts = get_recipe_amounts(recipe_id)
+    delta = Counter(new_amounts)
+    delta.subtract(old_amounts)
+    apply_delta(get_cart_user_ids(recipe_id), delta)
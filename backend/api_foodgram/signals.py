@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Ingredient, Recipe, RecipeIngredients, Tag
+from .search import ingredient_index
+
+User = get_user_model()
+
+
+def touch_recipes(**filters):
+    """Сдвигает версию рецептов, чтобы сбросить их закэшированные карточки."""
+    Recipe.objects.filter(**filters).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=RecipeIngredients)
+def recipe_ingredients_changed(sender, instance, **kwargs):
+    touch_recipes(pk=instance.recipe_id)
+
+
+@receiver(post_delete, sender=RecipeIngredients)
+def recipe_ingredients_deleted(sender, instance, origin, **kwargs):
+    # Удаление QuerySet шлёт сигнал на каждую строку: версия рецепта
+    # сдвигается один раз на вызов delete().
+    touched = vars(origin).setdefault('_touched_recipe_ids', set())
+    if instance.recipe_id not in touched:
+        touched.add(instance.recipe_id)
+        touch_recipes(pk=instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_relations_changed(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        touch_recipes(pk=instance.pk)
+    elif pk_set:
+        touch_recipes(pk__in=pk_set)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def tag_changed(sender, instance, **kwargs):
+    touch_recipes(tags=instance)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def ingredient_changed(sender, instance, **kwargs):
+    touch_recipes(ingredients=instance)
+    ingredient_index.invalidate()
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields and set(update_fields) <= {'last_login'}:
+        return
+    touch_recipes(author=instance)
@@ -0,0 +1,198 @@
+import json
+import os
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from users.models import Subscription
+
+from .management.commands.explain_queries import BASELINE_PATH
+from .management.commands.explain_queries import Command as ExplainCommand
+from .management.commands.explain_queries import new_nodes
+from .models import (Ingredient, Recipe, RecipeIngredients, ShoppingCart, Tag,
+                     UserFavorite)
+from .views import RecipeViewSet
+
+User = get_user_model()
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class StrictQueryBudgetTestCase(TestCase):
+    """Превышение QUERY_BUDGETS в тестах - ошибка QueryBudgetExceeded."""
+
+
+class RecipeDataTestCase(StrictQueryBudgetTestCase):
+    """Пользователи, тэги и рецепты с избранным, списком покупок и
+    подпиской."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                username=f'user{number}', email=f'user{number}@example.com',
+                first_name='Имя', last_name='Фамилия', password='password')
+            for number in range(3)]
+        cls.tags = [
+            Tag.objects.create(name=f'Тэг {number}', color=f'#00000{number}',
+                               slug=f'tag{number}')
+            for number in range(3)]
+        ingredients = [
+            Ingredient.objects.create(name=f'ингредиент {number}',
+                                      measurement_unit='г')
+            for number in range(6)]
+        cls.recipes = []
+        for number in range(5):
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {number}', text='Описание',
+                cooking_time=number + 1,
+                author=cls.users[number % len(cls.users)],
+                image=f'recipes/images/{number}.png',
+                image_card=(f'recipes/images/card/{number}.webp'
+                            if number % 2 else ''))
+            recipe.tags.set(cls.tags[:number % 3 + 1])
+            RecipeIngredients.objects.bulk_create(
+                RecipeIngredients(recipe=recipe, ingredient=ingredient,
+                                  amount=amount + 1)
+                for amount, ingredient in enumerate(
+                    ingredients[number:number + 3]))
+            cls.recipes.append(recipe)
+        user = cls.users[0]
+        UserFavorite.objects.create(user=user, recipe=cls.recipes[1])
+        ShoppingCart.objects.create(user=user, recipe=cls.recipes[2])
+        Subscription.objects.create(user=user, author=cls.users[1])
+
+
+class RecipeReadPathParityTest(RecipeDataTestCase):
+    """Ответы values()-пути совпадают с ответами сериализаторов DRF
+    байт в байт."""
+
+    def setUp(self):
+        authenticated = APIClient()
+        authenticated.force_authenticate(self.users[0])
+        self.clients = {'anonymous': APIClient(),
+                        'authenticated': authenticated}
+
+    def get_content(self, client, url, lean_read_path):
+        cache.clear()
+        with mock.patch.object(RecipeViewSet, 'lean_read_path',
+                               lean_read_path):
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.content
+
+    def assert_parity(self, client, url):
+        content = self.get_content(client, url, lean_read_path=False)
+        self.assertEqual(
+            self.get_content(client, url, lean_read_path=True), content)
+        return content
+
+    def test_parity(self):
+        urls = (
+            '/api/recipes/',
+            '/api/recipes/?limit=2&page=2',
+            f'/api/recipes/?tags={self.tags[1].slug}',
+            f'/api/recipes/?author={self.users[1].pk}',
+            f'/api/recipes/{self.recipes[1].pk}/',
+            f'/api/recipes/{self.recipes[4].pk}/',
+        )
+        for name, client in self.clients.items():
+            for url in urls:
+                with self.subTest(user=name, url=url):
+                    self.assert_parity(client, url)
+        for url in ('/api/recipes/?is_favorited=1',
+                    '/api/recipes/?is_in_shopping_cart=1'):
+            with self.subTest(user='authenticated', url=url):
+                self.assert_parity(self.clients['authenticated'], url)
+
+    def test_cursor_pages_parity(self):
+        for name, client in self.clients.items():
+            url = '/api/recipes/?pagination=cursor&limit=2'
+            while url:
+                with self.subTest(user=name, url=url):
+                    content = self.assert_parity(client, url)
+                url = json.loads(content)['next']
+
+
+class QueryBudgetTest(RecipeDataTestCase):
+    """Эндпоинты укладываются в QUERY_BUDGETS с аутентификацией по
+    токену."""
+
+    def test_endpoints_within_budget(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token {}'.format(
+            Token.objects.create(user=self.users[0]).key))
+        recipe = self.recipes[1]
+        endpoints = (
+            ('RecipeViewSet.list', '/api/recipes/'),
+            ('RecipeViewSet.list',
+             f'/api/recipes/?tags={self.tags[0].slug}&is_favorited=1'),
+            ('RecipeViewSet.list', '/api/recipes/?pagination=cursor'),
+            ('RecipeViewSet.retrieve', f'/api/recipes/{recipe.pk}/'),
+            ('RecipeViewSet.feed', '/api/recipes/feed/'),
+            ('RecipeViewSet.download_shopping_cart',
+             '/api/recipes/download_shopping_cart/?format=csv'),
+            ('TagView.list', '/api/tags/'),
+            ('IngredientView.list', '/api/ingredients/'),
+            ('CustomUserView.list', '/api/users/'),
+            ('SubscriptionListView.list',
+             '/api/users/subscriptions/?recipes_limit=2'),
+        )
+        for route, url in endpoints:
+            with self.subTest(url=url):
+                self.assertIn(route, settings.QUERY_BUDGETS)
+                cache.clear()
+                response = client.get(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                self.assertEqual(response.status_code, 200)
+
+
+class ConditionalGetTest(StrictQueryBudgetTestCase):
+    """Проверка ETag не меняет ответов на некорректные запросы."""
+
+    def test_non_numeric_pk_is_not_found(self):
+        user = User.objects.create_user(
+            username='user', email='user@example.com', password='password')
+        authenticated = APIClient()
+        authenticated.force_authenticate(user)
+        for name, client in (('anonymous', APIClient()),
+                             ('authenticated', authenticated)):
+            for url in ('/api/recipes/abc/', '/api/tags/abc/',
+                        '/api/ingredients/abc/'):
+                with self.subTest(user=name, url=url):
+                    self.assertEqual(client.get(url).status_code, 404)
+
+
+@skipUnless(connection.vendor == 'postgresql',
+            'Планы EXPLAIN сверяются только на PostgreSQL')
+class ExplainPlansTest(StrictQueryBudgetTestCase):
+    """В планах запросов основных эндпоинтов нет Seq Scan и Sort сверх
+    эталона explain_baseline.json. Чтобы записать новый эталон, тест
+    запускается с EXPLAIN_BASELINE_UPDATE=1."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_fake_data', users=200, recipes=1000,
+                     seed=1, stdout=StringIO())
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def test_no_new_seq_scans_or_sorts(self):
+        plans = ExplainCommand(stdout=StringIO()).get_plans(verbosity=0)
+        if os.getenv('EXPLAIN_BASELINE_UPDATE'):
+            with open(BASELINE_PATH, 'w', encoding='utf-8') as file:
+                json.dump(plans, file, ensure_ascii=False, indent=2)
+                file.write('\n')
+            self.skipTest(f'Эталон записан в {BASELINE_PATH}')
+        with open(BASELINE_PATH, encoding='utf-8') as file:
+            baseline = json.load(file)
+        self.assertEqual(plans.keys(), baseline.keys())
+        self.assertEqual(list(new_nodes(plans, baseline)), [])
@@ -0,0 +1,59 @@
+"""Запись рецептов в избранное и список покупок пользователя.
+
+Пара (пользователь, рецепт) уникальна, поэтому добавление делается
+одним INSERT ... ON CONFLICT DO NOTHING, а о результате судим по
+RETURNING: вернулись только действительно добавленные рецепты. Так
+повторное нажатие, даже параллельное, не создаёт дубликатов и не
+требует чтения перед записью. bulk_create(ignore_conflicts=True)
+здесь не подходит: с ним Django не возвращает вставленные строки.
+"""
+from django.db import connection
+from django.utils import timezone
+
+from .models import Recipe
+
+
+def _column(model, name):
+    return connection.ops.quote_name(model._meta.get_field(name).column)
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def add(model, user_id, recipe_ids):
+    """Добавляет существующие рецепты из recipe_ids, которых ещё нет у
+    пользователя, и возвращает множество добавленных id."""
+    if not recipe_ids:
+        return set()
+    user, recipe = _column(model, 'user'), _column(model, 'recipe')
+    sql = (
+        f'INSERT INTO {_table(model)} '
+        f'({user}, {recipe}, {_column(model, "created_at")}) '
+        f'SELECT %s, {_column(Recipe, "id")}, %s FROM {_table(Recipe)} '
+        f'WHERE {_column(Recipe, "id")} IN ({_placeholders(recipe_ids)}) '
+        f'ON CONFLICT ({user}, {recipe}) DO NOTHING '
+        f'RETURNING {recipe}')
+    created_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id, created_at, *recipe_ids])
+        return {row[0] for row in cursor.fetchall()}
+
+
+def remove(model, user_id, recipe_ids):
+    """Удаляет рецепты пользователя и возвращает множество удалённых
+    id."""
+    if not recipe_ids:
+        return set()
+    user, recipe = _column(model, 'user'), _column(model, 'recipe')
+    sql = (
+        f'DELETE FROM {_table(model)} '
+        f'WHERE {user} = %s AND {recipe} IN ({_placeholders(recipe_ids)}) '
+        f'RETURNING {recipe}')
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id, *recipe_ids])
+        return {row[0] for row in cursor.fetchall()}
@@ -0,0 +1,93 @@
+"""Облегчённое чтение рецептов из строк values() без сериализаторов DRF.
+
+RecipeValuesSerializer строит ровно тот же JSON, что и
+RecipeResponseSerializer, но не создаёт экземпляры моделей и не
+вызывает сериализаторы поле за полем: рецепты с авторами, ингредиенты
+и тэги читаются тремя запросами values() и собираются в словари.
+"""
+from collections import defaultdict
+
+from .images import VARIANTS
+from .models import Recipe, RecipeIngredients
+
+RECIPE_FIELDS = (
+    'id', 'name', 'image', 'image_card', 'image_detail', 'text',
+    'cooking_time', 'created_at', 'updated_at', 'author_id',
+    'author__email', 'author__username', 'author__first_name',
+    'author__last_name')
+
+
+class RecipeValuesSerializer:
+    row_fields = RECIPE_FIELDS + ('is_favorited', 'is_in_shopping_cart')
+
+    def __init__(self, rows, context=None):
+        self.rows = rows
+        self.context = context or {}
+
+    def _image_url(self, name):
+        if not name:
+            return None
+        url = Recipe._meta.get_field('image').storage.url(name)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    @staticmethod
+    def _load_ingredients(recipe_ids):
+        ingredients = defaultdict(list)
+        rows = (RecipeIngredients.objects
+                .filter(recipe_id__in=recipe_ids)
+                .order_by('id')
+                .values_list('recipe_id', 'ingredient_id', 'ingredient__name',
+                             'ingredient__measurement_unit', 'amount'))
+        for recipe_id, pk, name, measurement_unit, amount in rows:
+            ingredients[recipe_id].append({
+                'id': pk,
+                'name': name,
+                'measurement_unit': measurement_unit,
+                'amount': amount})
+        return ingredients
+
+    @staticmethod
+    def _load_tags(recipe_ids):
+        tags = defaultdict(list)
+        rows = (Recipe.tags.through.objects
+                .filter(recipe_id__in=recipe_ids)
+                .order_by('tag__name')
+                .values_list('recipe_id', 'tag_id', 'tag__name',
+                             'tag__color', 'tag__slug'))
+        for recipe_id, pk, name, color, slug in rows:
+            tags[recipe_id].append({
+                'id': pk,
+                'name': name,
+                'color': color,
+                'slug': slug})
+        return tags
+
+    @property
+    def data(self):
+        recipe_ids = [row['id'] for row in self.rows]
+        ingredients = self._load_ingredients(recipe_ids)
+        tags = self._load_tags(recipe_ids)
+        subscribed_authors = self.context.get('subscribed_authors', ())
+        return [{
+            'id': row['id'],
+            'ingredients': ingredients[row['id']],
+            'tags': tags[row['id']],
+            'image': self._image_url(row['image']),
+            'images': {key: self._image_url(row[field] or row['image'])
+                       for key, (field, _) in VARIANTS.items()},
+            'name': row['name'],
+            'text': row['text'],
+            'cooking_time': row['cooking_time'],
+            'author': {
+                'email': row['author__email'],
+                'id': row['author_id'],
+                'username': row['author__username'],
+                'first_name': row['author__first_name'],
+                'last_name': row['author__last_name'],
+                'is_subscribed': row['author_id'] in subscribed_authors},
+            'is_favorited': row.get('is_favorited', False),
+            'is_in_shopping_cart': row.get('is_in_shopping_cart', False),
+        } for row in self.rows]
@@ -1,31 +1,51 @@
 from django.contrib.auth import get_user_model
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import (BooleanField, Count, Exists, Max, OuterRef,
+                              Prefetch, Value, prefetch_related_objects)
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.http import content_disposition_header
 from django_filters.rest_framework import DjangoFilterBackend
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
 from rest_framework import filters, mixins, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet, ModelViewSet
 
+from foodgram_backend.instrumentation import InstrumentedViewMixin, timer
+from foodgram_backend.pagination import (FeedCursorPagination,
+                                         RecipeCursorPagination)
+from users.mixins import SubscribedAuthorsMixin
 from users.models import Subscription
 
+from . import (cache, counters, documents, feed, shopping_list,
+               user_recipes)
 from .filters import RecipeFilter
+from .mixins import ConditionalGetMixin
 from .models import (Ingredient, Recipe, RecipeIngredients, ShoppingCart, Tag,
                      UserFavorite)
+from .pdf import SHOPPING_LIST_TITLE
 from .permissions import IsAuthorOrReadPermission, IsAuthorPermission
+from .renderers import (ShoppingListCSVRenderer, ShoppingListPDFRenderer,
+                        ShoppingListRenderer, ShoppingListStreamRenderer,
+                        ShoppingListTextRenderer)
+from .search import fuzzy_search, ingredient_index
 from .serializers import (IngredientSerializer, RecipeCreateUpdateSerializer,
-                          RecipeReadSerializer, RecipeResponseSerializer,
-                          SubscriptionSerializer, TagSerializer)
+                          RecipeIdsSerializer, RecipeReadSerializer,
+                          RecipeResponseSerializer, SubscriptionSerializer,
+                          TagSerializer)
+from .values_serializers import RecipeValuesSerializer
 from django.conf import settings
 
 User = get_user_model()
 
 
-class TagView(mixins.RetrieveModelMixin,
+class TagView(InstrumentedViewMixin,
+              ConditionalGetMixin,
+              mixins.RetrieveModelMixin,
               mixins.ListModelMixin,
               GenericViewSet):
     serializer_class = TagSerializer
@@ -34,7 +54,9 @@ class TagView(mixins.RetrieveModelMixin,
     pagination_class = None
 
 
-class IngredientView(mixins.RetrieveModelMixin,
+class IngredientView(InstrumentedViewMixin,
+                     ConditionalGetMixin,
+                     mixins.RetrieveModelMixin,
                      mixins.ListModelMixin,
                      GenericViewSet):
     serializer_class = IngredientSerializer
@@ -43,9 +65,29 @@ class IngredientView(mixins.RetrieveModelMixin,
     search_fields = ('^name',)
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, ]
     pagination_class = None
+    limit_query_param = 'limit'
+    fuzzy_query_param = 'fuzzy'
 
+    def get_limit(self, default=None):
+        try:
+            limit = int(self.request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return default
+        return limit if limit > 0 else default
 
-class RecipeViewSet(ModelViewSet):
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get(api_settings.SEARCH_PARAM)
+        if name is None:
+            return super().list(request, *args, **kwargs)
+        if request.query_params.get(self.fuzzy_query_param) == '1':
+            limit = min(self.get_limit(settings.INGREDIENT_SEARCH_LIMIT),
+                        settings.INGREDIENT_SEARCH_MAX_LIMIT)
+            return Response(fuzzy_search(name, limit))
+        return Response(ingredient_index.search(name, self.get_limit()))
+
+
+class RecipeViewSet(InstrumentedViewMixin, ConditionalGetMixin,
+                    SubscribedAuthorsMixin, ModelViewSet):
     queryset = Recipe.objects.all()
     serializer_class = RecipeCreateUpdateSerializer
     http_method_names = ['get', 'post', 'patch', 'delete']
@@ -53,61 +95,266 @@ class RecipeViewSet(ModelViewSet):
     filterset_class = RecipeFilter
     permission_classes = [IsAuthorOrReadPermission,
                           permissions.IsAuthenticatedOrReadOnly]
+    cursor_pagination_class = RecipeCursorPagination
+    feed_pagination_class = FeedCursorPagination
+    lean_read_path = settings.RECIPE_LEAN_READ_PATH
+    vary_on_user = True
+    select_related_fields = ('author',)
+    async_query_param = 'async'
+    shopping_list_renderers = [ShoppingListPDFRenderer,
+                               JSONRenderer,
+                               ShoppingListCSVRenderer,
+                               ShoppingListTextRenderer]
+    prefetch_plan = (
+        Prefetch('tags'),
+        Prefetch('recipe_ingredients',
+                 queryset=RecipeIngredients.objects.select_related(
+                     'ingredient')),
+    )
+
+    def get_queryset(self):
+        queryset = super().get_queryset().select_related(
+            *self.select_related_fields)
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField()))
+        return queryset.annotate(
+            is_favorited=Exists(UserFavorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))))
+
+    @property
+    def paginator(self):
+        if (not hasattr(self, '_paginator')
+                and self.cursor_pagination_class.is_requested(self.request)):
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
 
     def get_serializer_class(self):
         if self.request.method in ['GET']:
             return RecipeResponseSerializer
         return super().get_serializer_class()
 
+    def get_read_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.lean_read_path:
+            return queryset.values(*RecipeValuesSerializer.row_fields)
+        return queryset
+
+    def _serialize_recipes(self, recipes):
+        if not self.lean_read_path:
+            prefetch_related_objects(recipes, *self.prefetch_plan)
+            return self.get_serializer(recipes, many=True).data
+        with timer('serializer'):
+            return RecipeValuesSerializer(
+                recipes, context=self.get_serializer_context()).data
+
+    def _render_recipes(self, recipes):
+        cards = cache.get_cards(self.request, recipes)
+        missing = [recipe for recipe in recipes
+                   if cache.recipe_id(recipe) not in cards]
+        if missing:
+            cards.update(cache.set_cards(
+                self.request, missing, self._serialize_recipes(missing)))
+        subscribed_authors = self.get_serializer_context().get(
+            'subscribed_authors', ())
+        return [cache.personalize(cards[cache.recipe_id(recipe)], recipe,
+                                  subscribed_authors)
+                for recipe in recipes]
+
+    def get_validators_queryset(self):
+        return self.filter_queryset(Recipe.objects.all())
+
+    def _user_state(self):
+        """Количество и дата последнего изменения избранного, списка покупок
+        и подписок пользователя - от них зависят персональные флаги."""
+        user = self.request.user
+        if user.is_anonymous:
+            return []
+        parts = [
+            model.objects.filter(user=user).order_by().values('user')
+            .annotate(kind=Value(model._meta.model_name),
+                      count=Count('pk'), last=Max(date_field))
+            .values_list('kind', 'count', 'last')
+            for model, date_field in ((UserFavorite, 'created_at'),
+                                      (ShoppingCart, 'created_at'),
+                                      (Subscription, 'subscribed_at'))]
+        return sorted(parts[0].union(*parts[1:], all=True))
+
+    def get_list_validators(self):
+        etag_parts, last_modified = super().get_list_validators()
+        return etag_parts + self._user_state(), last_modified
+
+    def get_detail_validators(self):
+        etag_parts, last_modified = super().get_detail_validators()
+        if etag_parts is None or self.request.user.is_anonymous:
+            return etag_parts, last_modified
+        return etag_parts + self._user_state(), None
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.get_list_validators(), self._list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.get_detail_validators(), self._retrieve,
+            request, *args, **kwargs)
+
+    def _list(self, request, *args, **kwargs):
+        queryset = self.get_read_queryset()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self._render_recipes(page))
+        return Response(self._render_recipes(list(queryset)))
+
+    def _retrieve(self, request, *args, **kwargs):
+        if not self.lean_read_path:
+            return Response(self._render_recipes([self.get_object()])[0])
+        recipe = get_object_or_404(self.get_read_queryset(),
+                                   pk=self.kwargs['pk'])
+        return Response(self._render_recipes([recipe])[0])
+
+    def _reload_instance(self, serializer):
+        serializer.instance = self.get_queryset().prefetch_related(
+            *self.prefetch_plan).get(pk=serializer.instance.pk)
+
+    def perform_create(self, serializer):
+        serializer.save()
+        self._reload_instance(serializer)
+
+    def perform_update(self, serializer):
+        serializer.save()
+        self._reload_instance(serializer)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        shopping_list.remove_recipe(instance.pk)
+        counters.change(User, [instance.author_id], 'recipes_count', -1)
+        instance.delete()
+
     def _create_cart_or_favorite(self, request, pk, model, serializer_class):
-        user = request.user
-        recipe = Recipe.objects.filter(id=pk).first()
-        if not recipe:
-            return Response({'errors': 'Рецепт не найден'},
-                            status=status.HTTP_400_BAD_REQUEST)
-        serializer = self.get_serializer(recipe)
-        if model.objects.filter(user=user, recipe=recipe).exists():
+        try:
+            pk = int(pk)
+        except ValueError:
+            pk = None
+        if pk is None or not user_recipes.add(model, request.user.pk, [pk]):
+            # Причину отказа выясняем, только когда вставки не было.
+            if pk is None or not Recipe.objects.filter(pk=pk).exists():
+                return Response({'errors': 'Рецепт не найден'},
+                                status=status.HTTP_400_BAD_REQUEST)
             return Response({"error": "Уже существует"},
                             status=status.HTTP_400_BAD_REQUEST)
-        model.objects.create(user=user, recipe=recipe)
+        counters.change_recipes(model, [pk], 1)
+        serializer = self.get_serializer(Recipe.objects.get(pk=pk))
         return Response(serializer.data,
                         status=status.HTTP_201_CREATED)
 
     def _delete_cart_or_favorite(self, request, pk, model, serializer_class):
-        recipe = get_object_or_404(Recipe, id=pk)
-        get_object_or_404(model, recipe=recipe, user=request.user).delete()
+        try:
+            deleted = user_recipes.remove(model, request.user.pk, [int(pk)])
+        except ValueError:
+            deleted = None
+        if not deleted:
+            raise Http404
+        counters.change_recipes(model, deleted, -1)
         return Response({"detail": "Удалено"},
                         status=status.HTTP_204_NO_CONTENT)
-        # Если необходимо возвращать ошибку 400 можно раскомментировать
-        # item = model.objects.filter(user=request.user,
-        #                             recipe=recipe)
-        # if item:
-        #     item.delete()
-        #     return Response(
-        #         {"detail": "Удалено"},
-        #         status=status.HTTP_204_NO_CONTENT)
-        # return Response({"error": "Некорректные данные"},
-        #                 status=status.HTTP_400_BAD_REQUEST)
+
+    def _recipe_ids(self, request):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['recipes']
+
+    def _add_batch(self, request, model):
+        """Добавляет рецепты одним INSERT и возвращает результаты по
+        каждому id и список добавленных id."""
+        recipe_ids = self._recipe_ids(request)
+        added = user_recipes.add(model, request.user.pk, recipe_ids)
+        counters.change_recipes(model, added, 1)
+        found = added
+        if len(added) < len(recipe_ids):
+            found = set(Recipe.objects.filter(
+                pk__in=recipe_ids).values_list('pk', flat=True))
+        results = [
+            {'id': pk,
+             'status': (status.HTTP_201_CREATED if pk in added
+                        else status.HTTP_400_BAD_REQUEST if pk in found
+                        else status.HTTP_404_NOT_FOUND)}
+            for pk in recipe_ids]
+        return Response({'results': results}), list(added)
+
+    def _delete_batch(self, request, model):
+        """Удаляет рецепты одним DELETE и возвращает результаты по
+        каждому id и список удалённых id."""
+        recipe_ids = self._recipe_ids(request)
+        deleted = user_recipes.remove(model, request.user.pk, recipe_ids)
+        counters.change_recipes(model, deleted, -1)
+        results = [
+            {'id': pk,
+             'status': (status.HTTP_204_NO_CONTENT if pk in deleted
+                        else status.HTTP_404_NOT_FOUND)}
+            for pk in recipe_ids]
+        return Response({'results': results}), list(deleted)
+
+    @action(detail=False, methods=['POST', ],
+            url_path='shopping_cart',
+            serializer_class=RecipeIdsSerializer)
+    @transaction.atomic
+    def shopping_cart_batch(self, request):
+        response, added = self._add_batch(request, ShoppingCart)
+        shopping_list.add_recipes(added, [request.user.pk])
+        return response
+
+    @shopping_cart_batch.mapping.delete
+    @transaction.atomic
+    def shopping_cart_batch_delete(self, request):
+        response, deleted = self._delete_batch(request, ShoppingCart)
+        shopping_list.remove_recipes(deleted, [request.user.pk])
+        return response
+
+    @action(detail=False, methods=['POST', ],
+            url_path='favorite',
+            serializer_class=RecipeIdsSerializer)
+    @transaction.atomic
+    def favorite_batch(self, request):
+        return self._add_batch(request, UserFavorite)[0]
+
+    @favorite_batch.mapping.delete
+    @transaction.atomic
+    def favorite_batch_delete(self, request):
+        return self._delete_batch(request, UserFavorite)[0]
 
     @action(detail=True, methods=['POST', ],
             serializer_class=RecipeReadSerializer)
+    @transaction.atomic
     def shopping_cart(self, request, pk):
-        return self._create_cart_or_favorite(
+        response = self._create_cart_or_favorite(
             request,
             pk,
             ShoppingCart,
             RecipeReadSerializer)
+        if response.status_code == status.HTTP_201_CREATED:
+            shopping_list.add_recipe(pk, [request.user.pk])
+        return response
 
     @shopping_cart.mapping.delete
+    @transaction.atomic
     def shopping_cart_delete(self, request, pk):
-        return self._delete_cart_or_favorite(
+        response = self._delete_cart_or_favorite(
             request,
             pk,
             ShoppingCart,
             RecipeReadSerializer)
+        if response.status_code == status.HTTP_204_NO_CONTENT:
+            shopping_list.remove_recipe(pk, [request.user.pk])
+        return response
 
     @action(detail=True, methods=['POST', ],
             serializer_class=RecipeReadSerializer)
+    @transaction.atomic
     def favorite(self, request, pk):
         return self._create_cart_or_favorite(
             request,
@@ -116,6 +363,7 @@ class RecipeViewSet(ModelViewSet):
             RecipeReadSerializer)
 
     @favorite.mapping.delete
+    @transaction.atomic
     def favorite_delete(self, request, pk):
         return self._delete_cart_or_favorite(
             request,
@@ -123,73 +371,162 @@ class RecipeViewSet(ModelViewSet):
             UserFavorite,
             RecipeReadSerializer)
 
+    @action(detail=False, methods=['GET'],
+            permission_classes=[permissions.IsAuthenticated, ])
+    def feed(self, request):
+        """Рецепты авторов, на которых подписан пользователь, от новых к
+        старым, с курсорной пагинацией."""
+        author_ids = feed.large_author_ids(request.user)
+        if author_ids:
+            queryset = self.get_read_queryset().filter(
+                feed.recipes_filter(request.user, author_ids))
+            paginator = self.cursor_pagination_class()
+            page = paginator.paginate_queryset(queryset, request, view=self)
+        else:
+            paginator = self.feed_pagination_class()
+            page = self._get_feed_page(paginator)
+        return paginator.get_paginated_response(self._render_recipes(page))
+
+    def _get_feed_page(self, paginator):
+        """Страница ленты по записям FeedEntry и её рецепты в том же
+        порядке."""
+        entries = feed.entries(self.request.user)
+        filter_names = self.filterset_class.base_filters
+        if self.request.query_params.keys() & filter_names:
+            entries = entries.filter(recipe__in=self.filter_queryset(
+                Recipe.objects.all()).values('pk'))
+        entries = paginator.paginate_queryset(entries, self.request,
+                                              view=self)
+        recipes = {
+            cache.recipe_id(recipe): recipe
+            for recipe in self.get_read_queryset().filter(
+                pk__in=[entry.recipe_id for entry in entries]).order_by()}
+        return [recipes[entry.recipe_id] for entry in entries
+                if entry.recipe_id in recipes]
+
+    def _respond_with_json(self):
+        self.request.accepted_renderer = JSONRenderer()
+        self.request.accepted_media_type = JSONRenderer.media_type
+
+    def handle_exception(self, exc):
+        # Ошибки выгрузки списка покупок отдаются в JSON, а не в
+        # формате запрошенного документа.
+        if any(issubclass(renderer, ShoppingListRenderer)
+               for renderer in self.renderer_classes):
+            self._respond_with_json()
+        return super().handle_exception(exc)
+
     @staticmethod
-    def get_pdf_list(items_list, title='Список покупок'):
-
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename={title}.pdf'
-
-        p = canvas.Canvas(response)
-        font_path = getattr(settings, 'FONT_PATH', None)
-        pdfmetrics.registerFont(TTFont('Arial', str(font_path) + '/arial.ttf'))
-        p.setFont("Arial", 12)
-        p.drawCentredString(300, 750, title)
-        y_coordinate = 700
-        for item, detail in items_list.items():
-            output_text = (f"-{item}: "
-                           f"{detail['amount']} "
-                           f"{detail['measure']}")
-            p.drawString(100, y_coordinate, output_text)
-            y_coordinate -= 20
-        p.showPage()
-        p.save()
+    def _document_response(renderer, content):
+        response = HttpResponse(content, content_type=renderer.media_type)
+        response['Content-Disposition'] = content_disposition_header(
+            as_attachment=True,
+            filename=f'{SHOPPING_LIST_TITLE}.{renderer.format}')
         return response
 
+    def _job_response(self, job_id):
+        self._respond_with_json()
+        url = self.reverse_action(
+            self.download_shopping_cart_job.url_name,
+            kwargs={'job_id': job_id})
+        return Response(
+            {'job_id': job_id, 'status': 'pending', 'url': url},
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': url, 'Retry-After': '1'})
+
     @action(detail=False, methods=['GET'],
             serializer_class=None,
-            permission_classes=[permissions.IsAuthenticated, ])
+            permission_classes=[permissions.IsAuthenticated, ],
+            renderer_classes=shopping_list_renderers)
     def download_shopping_cart(self, request):
+        items = shopping_list.get_shopping_list(request.user)
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, ShoppingListRenderer):
+            return Response(list(items))
+        if isinstance(renderer, ShoppingListStreamRenderer):
+            response = StreamingHttpResponse(
+                renderer.stream(items.iterator()),
+                content_type=f'{renderer.media_type}; '
+                             f'charset={renderer.charset}')
+            response['Content-Disposition'] = content_disposition_header(
+                as_attachment=True,
+                filename=f'{SHOPPING_LIST_TITLE}.{renderer.format}')
+            return response
+        rows = list(items)
+        job_id = documents.get_job_id(request.user.pk, renderer, rows)
+        document = documents.get_document(job_id, request.user.pk)
+        if document is not None:
+            return self._document_response(renderer, document['content'])
+        if (request.query_params.get(self.async_query_param) == '1'
+                and len(rows) >= settings.SHOPPING_LIST_ASYNC_MIN_ITEMS):
+            documents.submit(job_id, request.user.pk, renderer, rows)
+            return self._job_response(job_id)
+        content = documents.render_document(
+            job_id, request.user.pk, renderer, rows)
+        return self._document_response(renderer, content)
 
-        user_cart = (ShoppingCart.
-                     objects.filter(user=self.request.user).
-                     select_related('recipe'))
-        recipes_in_cart = [cart_item.recipe for cart_item in user_cart]
-
-        all_ingredients = (RecipeIngredients.
-                           objects.filter(recipe__in=recipes_in_cart).
-                           select_related('ingredient'))
-        ingredients_list = {}
-
-        for recipe_ingredient in all_ingredients:
-            name = recipe_ingredient.ingredient.name
-            amount = recipe_ingredient.amount
-            measurement_unit = recipe_ingredient.ingredient.measurement_unit
-            if name not in ingredients_list:
-                ingredients_list[name] = {
-                    'amount': amount,
-                    'measure': measurement_unit}
-            else:
-                ingredients_list[name]['amount'] += amount
-
-        return self.get_pdf_list(items_list=ingredients_list)
+    @action(detail=False, methods=['GET'],
+            url_path=r'download_shopping_cart/(?P<job_id>[0-9a-f]{32})',
+            serializer_class=None,
+            permission_classes=[permissions.IsAuthenticated, ])
+    def download_shopping_cart_job(self, request, job_id):
+        document = documents.get_document(job_id, request.user.pk)
+        if document is not None:
+            renderer = next(
+                renderer() for renderer in self.shopping_list_renderers
+                if renderer.format == document['format'])
+            return self._document_response(renderer, document['content'])
+        if documents.is_pending(job_id, request.user.pk):
+            return self._job_response(job_id)
+        return Response({'errors': 'Документ не найден'},
+                        status=status.HTTP_404_NOT_FOUND)
 
 
-class SubscriptionListView(mixins.ListModelMixin, GenericViewSet):
+class SubscriptionListView(InstrumentedViewMixin,
+                           SubscribedAuthorsMixin,
+                           mixins.ListModelMixin,
+                           GenericViewSet):
     serializer_class = SubscriptionSerializer
     queryset = User.objects.all()
     permission_classes = [IsAuthorPermission, ]
 
+    preview_fields = ('id', 'author', 'name', 'image', 'image_card',
+                      'image_detail', 'cooking_time')
+
+    def get_recipes_limit(self):
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        if not recipes_limit:
+            return None
+        try:
+            recipes_limit = int(recipes_limit)
+        except ValueError:
+            recipes_limit = -1
+        if recipes_limit < 0:
+            raise ValidationError(
+                {'recipes_limit': 'Должно быть неотрицательным числом'})
+        return recipes_limit
+
     def get_queryset(self):
-        current_user = self.request.user
-        following = current_user.subscriber.all()
-        subscribed_users = [subscription.author for subscription in following]
-        return subscribed_users
+        """Авторы, на которых подписан пользователь, в порядке подписки.
+        Превью рецептов всей страницы загружаются одним запросом с
+        ROW_NUMBER() по автору (срез в Prefetch)."""
+        previews = (Recipe.objects.only(*self.preview_fields)
+                    .order_by('-created_at', '-id'))
+        recipes_limit = self.get_recipes_limit()
+        if recipes_limit is not None:
+            previews = previews[:recipes_limit]
+        return (User.objects
+                .filter(subscribing__user=self.request.user)
+                .order_by('-subscribing__subscribed_at', '-subscribing__id')
+                .prefetch_related(Prefetch('recipe', queryset=previews,
+                                           to_attr='preview_recipes')))
 
 
 #
 class SubscriptionCreateDeleteView(APIView):
     permission_classes = [permissions.IsAuthenticated, ]
 
+    @transaction.atomic
     def post(self, request, id):
         current_user = request.user
         author = get_object_or_404(User, id=id)
@@ -206,16 +543,21 @@ class SubscriptionCreateDeleteView(APIView):
                     status=status.HTTP_400_BAD_REQUEST)
             subscription = Subscription(user=current_user, author=author)
             subscription.save()
+            counters.change_subscription(current_user.pk, author.pk, 1)
+            author.refresh_from_db(fields=['followers_count'])
+            feed.follow(current_user.pk, author)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @transaction.atomic
     def delete(self, request, id):
         current_user = request.user
         author = get_object_or_404(User, id=id)
-        subscription = Subscription.objects.filter(user=current_user,
-                                                   author=author)
-        if subscription:
-            subscription.delete()
+        deleted, _ = Subscription.objects.filter(user=current_user,
+                                                 author=author).delete()
+        if deleted:
+            counters.change_subscription(current_user.pk, author.pk, -1)
+            feed.unfollow(current_user.pk, author.pk)
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response({'errors': 'Некорректные данные'},
                         status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,37 @@
+"""Пул потоков для фоновых задач: отрисовки документов и картинок.
+
+Задачи выполняются в процессе, принявшем запрос. Соединения с базой,
+открытые задачей, закрываются после её завершения.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('foodgram.workers')
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.BACKGROUND_WORKERS,
+            thread_name_prefix='foodgram-worker')
+    return _executor
+
+
+def _run(func, *args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Фоновая задача %s завершилась ошибкой',
+                         func.__name__)
+    finally:
+        connections.close_all()
+
+
+def submit(func, *args):
+    return get_executor().submit(_run, func, *args)
@@ -0,0 +1,198 @@
+"""Учёт SQL-запросов и времени обработки запроса.
+
+RequestMetricsMiddleware считает запросы к БД и время их выполнения,
+время работы view и сериализаторов, отдаёт их в заголовке Server-Timing
+и пишет одной JSON-строкой в лог foodgram.requests. Для маршрутов из
+settings.QUERY_BUDGETS проверяется бюджет запросов: при превышении
+пишется предупреждение, а при QUERY_BUDGET_STRICT = True выбрасывается
+QueryBudgetExceeded. В тестах строгий режим включает базовый класс
+StrictQueryBudgetTestCase из api_foodgram/tests.py.
+
+Тело StreamingHttpResponse читается уже после выхода из middleware,
+поэтому запросы считаются до исчерпания или закрытия потока: заголовок
+Server-Timing отражает работу до отправки заголовков, а строка лога и
+проверка бюджета выполняются по окончании потока.
+"""
+import json
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('foodgram.requests')
+
+_current_metrics = ContextVar('request_metrics', default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.route = None
+        self.view_started = None
+        self.queries = 0
+        self.sql_time = 0.0
+        self.timings = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_time += time.perf_counter() - start
+
+    def add(self, name, duration):
+        self.timings[name] = self.timings.get(name, 0.0) + duration
+
+
+@contextmanager
+def timer(name):
+    """Добавляет время выполнения блока к метрике текущего запроса."""
+    metrics = _current_metrics.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.add(name, time.perf_counter() - start)
+
+
+def timed(name, func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with timer(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class InstrumentedViewMixin:
+    """Учитывает время валидации и рендеринга корневого сериализатора."""
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        serializer.run_validation = timed(
+            'serializer', serializer.run_validation)
+        serializer.to_representation = timed(
+            'serializer', serializer.to_representation)
+        return serializer
+
+
+class MeasuredStream:
+    """Тело StreamingHttpResponse, которое по исчерпании или закрытию
+    снимает обёртки execute и вызывает on_close."""
+
+    def __init__(self, content, wrappers, on_close):
+        self.content = content
+        self.wrappers = wrappers
+        self.on_close = on_close
+        self.closed = False
+
+    def __iter__(self):
+        try:
+            yield from self.content
+        finally:
+            self.close()
+
+    def close(self):
+        # Django вызывает close() при закрытии ответа, в том числе если
+        # поток не читали.
+        if self.closed:
+            return
+        self.closed = True
+        self.wrappers.close()
+        self.on_close()
+
+
+def get_route_name(view_func):
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return getattr(view_func, '__name__', None)
+    return view_class.__name__
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+                streaming = response.streaming and not response.is_async
+                if streaming:
+                    response.streaming_content = MeasuredStream(
+                        response.streaming_content, stack.pop_all(),
+                        lambda: self.report(request, response, metrics,
+                                            start))
+        finally:
+            _current_metrics.reset(token)
+        response['Server-Timing'] = self.server_timing(
+            metrics, self.get_durations(metrics, start))
+        if not streaming:
+            self.report(request, response, metrics, start)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = _current_metrics.get()
+        if metrics is None:
+            return None
+        route = get_route_name(view_func)
+        actions = getattr(view_func, 'actions', None)
+        if actions:
+            route = f'{route}.{actions.get(request.method.lower())}'
+        elif getattr(view_func, 'cls', None) is not None:
+            route = f'{route}.{request.method.lower()}'
+        metrics.route = route
+        metrics.view_started = time.perf_counter()
+        return None
+
+    @staticmethod
+    def get_durations(metrics, start):
+        finished = time.perf_counter()
+        view_started = metrics.view_started or finished
+        return {
+            'db': metrics.sql_time,
+            'serializer': metrics.timings.get('serializer', 0.0),
+            'view': finished - view_started,
+            'total': finished - start,
+        }
+
+    @staticmethod
+    def server_timing(metrics, durations):
+        return ', '.join(
+            [f'db;dur={durations["db"] * 1000:.1f};'
+             f'desc="{metrics.queries} queries"']
+            + [f'{name};dur={duration * 1000:.1f}'
+               for name, duration in durations.items() if name != 'db'])
+
+    def report(self, request, response, metrics, start):
+        durations = self.get_durations(metrics, start)
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'route': metrics.route,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            **{f'{name}_ms': round(duration * 1000, 2)
+               for name, duration in durations.items()},
+        }))
+        budget = getattr(settings, 'QUERY_BUDGETS', {}).get(metrics.route)
+        if budget is None or metrics.queries <= budget:
+            return
+        message = (f'{metrics.route}: {metrics.queries} SQL-запросов '
+                   f'при бюджете {budget} ({request.method} {request.path})')
+        if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
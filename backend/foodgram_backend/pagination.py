@@ -1,6 +1,26 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class CustomPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = 'limit'
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset-пагинация ленты рецептов без COUNT(*) и OFFSET."""
+    page_size = 6
+    page_size_query_param = 'limit'
+    ordering = ('-created_at', '-id')
+    mode_query_param = 'pagination'
+    mode = 'cursor'
+
+    @classmethod
+    def is_requested(cls, request):
+        return (cls.cursor_query_param in request.query_params
+                or request.query_params.get(cls.mode_query_param) == cls.mode)
+
+
+class FeedCursorPagination(RecipeCursorPagination):
+    """Keyset-пагинация записей ленты. Курсор совместим с
+    RecipeCursorPagination: позиция в обоих - дата публикации рецепта."""
+    ordering = ('-created_at', '-recipe_id')
@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework.authtoken',
     'rest_framework',
     'django_filters',
@@ -51,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram_backend.instrumentation.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -100,6 +102,59 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+RECIPE_CARD_CACHE_TIMEOUT = int(os.getenv('RECIPE_CARD_CACHE_TIMEOUT',
+                                          60 * 60))
+RECIPE_LEAN_READ_PATH = os.getenv('RECIPE_LEAN_READ_PATH', 'True') == 'True'
+INGREDIENT_INDEX_TTL = int(os.getenv('INGREDIENT_INDEX_TTL', 60))
+INGREDIENT_SEARCH_LIMIT = 20
+INGREDIENT_SEARCH_MAX_LIMIT = 100
+BACKGROUND_WORKERS = int(os.getenv('BACKGROUND_WORKERS', 2))
+SHOPPING_LIST_CACHE_TIMEOUT = int(os.getenv('SHOPPING_LIST_CACHE_TIMEOUT',
+                                            24 * 60 * 60))
+SHOPPING_LIST_RENDER_TIMEOUT = 5 * 60
+SHOPPING_LIST_ASYNC_MIN_ITEMS = 200
+RECIPE_IMAGE_MAX_SIZE = int(os.getenv('RECIPE_IMAGE_MAX_SIZE',
+                                      5 * 1024 * 1024))
+FEED_FANOUT_MAX_FOLLOWERS = int(os.getenv('FEED_FANOUT_MAX_FOLLOWERS',
+                                          10000))
+
+# Запросов на ответ в худшем случае: с токеном (+1 запрос) и с проверкой
+# If-None-Match, которая читает теги фильтра и состояние пользователя.
+QUERY_BUDGETS = {
+    'RecipeViewSet.list': 10,
+    'RecipeViewSet.retrieve': 7,
+    'RecipeViewSet.download_shopping_cart': 4,
+    'RecipeViewSet.feed': 6,
+    'TagView.list': 3,
+    'IngredientView.list': 3,
+    'CustomUserView.list': 4,
+    'SubscriptionListView.list': 6,
+}
+QUERY_BUDGET_STRICT = os.getenv('QUERY_BUDGET_STRICT', 'False') == 'True'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'foodgram': {
+            'handlers': ['console'],
+            'level': os.getenv('FOODGRAM_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -136,6 +191,7 @@ AUTH_USER_MODEL = 'users.CustomUser'
 STATIC_URL = '/static/django/'
 STATIC_ROOT = '/app/static_django/'
 FONT_PATH = BASE_DIR / 'static/fonts'
+PDF_SPOOL_MAX_SIZE = 1024 * 1024
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = '/var/www/foodgram/media/'
@@ -0,0 +1,28 @@
+from django.utils.functional import SimpleLazyObject
+
+
+def get_subscribed_authors(request):
+    """Множество id авторов, на которых подписан текущий пользователь.
+
+    Загружается одним запросом при первом обращении и хранится на
+    запросе, поэтому общее для всех сериализаторов, в том числе
+    вложенных, и для повторных вызовов get_serializer_context.
+    """
+    subscribed_authors = getattr(request, '_subscribed_authors', None)
+    if subscribed_authors is None:
+        user = request.user
+        subscribed_authors = SimpleLazyObject(
+            lambda: set(user.subscriber.order_by()
+                        .values_list('author_id', flat=True))
+            if user.is_authenticated else set())
+        request._subscribed_authors = subscribed_authors
+    return subscribed_authors
+
+
+class SubscribedAuthorsMixin:
+    """Передаёт сериализаторам subscribed_authors для is_subscribed."""
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['subscribed_authors'] = get_subscribed_authors(self.request)
+        return context
@@ -22,6 +22,22 @@ class CustomUser(AbstractUser):
         blank=False
     )
 
+    recipes_count = models.PositiveIntegerField(
+        'Число рецептов',
+        default=0,
+        editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков',
+        default=0,
+        editable=False
+    )
+    following_count = models.PositiveIntegerField(
+        'Число подписок',
+        default=0,
+        editable=False
+    )
+
     subscribers = models.ManyToManyField('self',
                                          symmetrical=False,
                                          through='Subscription')
@@ -59,6 +75,11 @@ class Subscription(models.Model):
                 name='unique_user_subscription'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['user', '-subscribed_at'],
+                name='subscription_user_date_idx'),
+        ]
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
         ordering = ('-subscribed_at',)
@@ -2,7 +2,7 @@ from django.contrib.auth import get_user_model
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
 
-from .models import Subscription
+from .mixins import get_subscribed_authors
 
 User = get_user_model()
 
@@ -22,10 +22,12 @@ class CustomUserSerializer(UserSerializer):
 
     def get_is_subscribed(self, instance):
         request = self.context.get('request', None)
-        user = request.user
-        if not request or user.is_anonymous:
+        if not request or request.user.is_anonymous:
             return False
-        return Subscription.objects.filter(user=user, author=instance).exists()
+        subscribed_authors = self.context.get('subscribed_authors')
+        if subscribed_authors is None:
+            subscribed_authors = get_subscribed_authors(request)
+        return instance.id in subscribed_authors
 
 
 class RecipeUserSerializer(CustomUserSerializer):
@@ -3,12 +3,16 @@ from djoser.views import UserViewSet
 from rest_framework import permissions
 from rest_framework.decorators import action
 
+from foodgram_backend.instrumentation import InstrumentedViewMixin
+
+from .mixins import SubscribedAuthorsMixin
 from .serializers import CustomUserSerializer
 
 User = get_user_model()
 
 
-class CustomUserView(UserViewSet):
+class CustomUserView(InstrumentedViewMixin, SubscribedAuthorsMixin,
+                     UserViewSet):
     http_method_names = ['get', 'post']
     permission_classes = [permissions.AllowAny, ]
     serializer_class = CustomUserSerializer